@@ -0,0 +1,154 @@
+"""asyncio entry points: parsing JSON as it arrives over a StreamReader.
+
+The source is an asyncio.StreamReader, or any async iterator of bytes or str
+chunks. Chunks are decoded as UTF-8 and scanned by a PushLexer as they arrive,
+and the tokens go to the iterative engine, which parses what it has while the
+rest of the input is still on its way:
+    reader, writer = await asyncio.open_connection(host, port)
+    value = await parse_async(reader)
+    async for document in iter_documents(reader):
+        ...
+    total = await parse_events_async(reader, handler)
+Nothing blocks the event loop for long: the engine pauses after budget tokens,
+and the scanner takes at most budget characters at a time, giving control
+back to the loop in between. A smaller budget keeps the loop more responsive,
+and a larger one parses a little faster.
+
+Options are those of the Parser. The engine is always the iterative one,
+and errors are raised as soon as they are found. The scanner runs up to a
+budget of tokens ahead of the parser, so in an input with several errors a
+scanning error just ahead can be raised before the parser's own."""
+import asyncio
+import codecs
+from collections import deque
+
+from JsonScanner import Lexer, PushLexer, TokenType
+from JsonParser import Parser, UnexpectedTokenError
+from JsonEvents import EventParser
+
+## Bytes asked of a StreamReader at a time
+READ_SIZE = 65536
+
+
+"""Gives the Parser the same interface as the Tokenizer over the tokens
+scanned so far. The AsyncParser adds tokens as they are scanned, and makes
+sure there are enough of them before the engine runs."""
+class TokenQueue:
+    def __init__(self) -> None:
+        self.tokens = deque()
+        self.current_index = -1
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def extend(self, tokens):
+        self.tokens.extend(tokens)
+
+    ## None once the tokens run out, as with the TokenStream
+    def next_token(self):
+        self.current_index += 1
+        return self.tokens.popleft() if self.tokens else None
+
+
+## Yields the chunks of the source: reads from anything with an async read(),
+## such as a StreamReader, and iterates over any other async iterator
+async def iter_chunks(source, read_size=READ_SIZE):
+    if hasattr(source, 'read'):
+        while True:
+            chunk = await source.read(read_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            yield chunk
+
+
+"""Runs a Parser over a source that is read as the parser needs more tokens.
+Between each read, each budget characters scanned and each budget tokens
+parsed, control goes back to the event loop."""
+class AsyncParser:
+    def __init__(self, source, parser, budget=1000, read_size=READ_SIZE) -> None:
+        if budget < 1:
+            raise ValueError(f"The budget must be at least one token, not {budget}")
+        ## the typed list fast path reads a whole list ahead, which may not have arrived yet
+        if getattr(parser, 'typed_arrays', None):
+            raise ValueError("typed_arrays isn't supported when parsing with asyncio")
+        self.chunks = iter_chunks(source, read_size)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.push_lexer = PushLexer(Lexer(record_symbols=False))
+        self.queue = TokenQueue()
+        self.parser = parser
+        self.parser.tokenizer = self.queue
+        self.budget = budget
+        self.closed = False
+
+    ## Reads and scans until at least count tokens are waiting, or the source is finished
+    async def fill(self, count):
+        while len(self.queue) < count and not self.closed:
+            try:
+                chunk = await self.chunks.__anext__()
+            except StopAsyncIteration:
+                self.queue.extend(self.push_lexer.feed(self.decoder.decode(b'', True)))
+                self.queue.extend(self.push_lexer.close())
+                self.closed = True
+                return
+            text = chunk if isinstance(chunk, str) else self.decoder.decode(chunk)
+            for start in range(0, len(text), self.budget):
+                if start > 0:
+                    await asyncio.sleep(0)
+                self.queue.extend(self.push_lexer.feed(text[start:start + self.budget]))
+
+    ## Reads the first token of the input, which is the parser's lookahead
+    async def start(self):
+        await self.fill(1)
+        self.parser.next_token()
+
+    ## Parses the value that starts at the current token, a budget of tokens at a time.
+    ## The engine never reads more than budget tokens between pauses,
+    ## so it never runs out of the tokens scanned so far
+    async def parse_value(self):
+        steps = self.parser.iterative_steps(self.budget)
+        while True:
+            await self.fill(self.budget)
+            try:
+                next(steps)
+            except StopIteration as finished:
+                return finished.value
+            await asyncio.sleep(0)
+
+    ## Parses the whole input as one document, followed by the end of the input
+    async def parse(self):
+        await self.start()
+        value = await self.parse_value()
+        try:
+            self.parser.eat(TokenType.EOF)
+        except UnexpectedTokenError as e:
+            self.parser.report(e)
+        return value
+
+    ## Yields each of the documents that follow each other in the input,
+    ## separated by whitespace or nothing at all, as soon as it has been parsed
+    async def iter_documents(self):
+        await self.start()
+        while self.parser.current_token.type != TokenType.EOF:
+            yield await self.parse_value()
+
+
+## Parses the source as one JSON document. Other keyword options go to the Parser
+async def parse_async(source, budget=1000, read_size=READ_SIZE, **options):
+    parser = Parser((), engine='iterative', **options)
+    return await AsyncParser(source, parser, budget, read_size).parse()
+
+## Yields the documents of a source holding many, such as newline-delimited JSON.
+## An error ends the iteration, since the documents after it can't be told apart
+async def iter_documents(source, budget=1000, read_size=READ_SIZE, **options):
+    parser = Parser((), engine='iterative', **options)
+    async for document in AsyncParser(source, parser, budget, read_size).iter_documents():
+        yield document
+
+## Parses the source as one document, sending the events to the handler as in JsonEvents.
+## Returns the handler's result. Other keyword options go to the EventParser
+async def parse_events_async(source, handler, budget=1000, read_size=READ_SIZE, **options):
+    await AsyncParser(source, EventParser((), handler, **options), budget, read_size).parse()
+    return handler.result()
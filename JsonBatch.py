@@ -0,0 +1,183 @@
+"""Scans and parses many files at once, spread over a pool of worker processes.
+
+Inputs are files, directories (every .txt and .json file in them) or glob patterns:
+    python JsonBatch.py ScannerInputs 'feeds/**/*.json' --out results --workers 4
+Each input gets an output file of the same relative path under --out, holding
+the parsed tree, repr(e) for a parse error, or the traceback of a scanning error.
+The values are taken straight from the Lexer's tokens, not from a ScannerOutput
+file, so string values are not left-stripped as JsonParser.main's are. The output
+files and the order of the summary don't depend on the number of workers."""
+import argparse
+import glob
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from JsonScanner import Lexer, write_tokens, write_token_file
+from JsonParser import Parser, JSONValue, RULE_PROFILES
+
+MEGABYTE = 1024 * 1024
+
+## The extensions of the files picked up from a directory
+INPUT_EXTENSIONS = ('.txt', '.json')
+
+
+"""The outcome of scanning and parsing one file. Results are sent back
+from the worker processes, so they only hold plain values."""
+class BatchResult:
+    __slots__ = ('path', 'status', 'size', 'tokens', 'scan_seconds', 'parse_seconds')
+
+    ## status is 'ok', 'scan error' or 'parse error', and size is the file's size in bytes
+    def __init__(self, path, status, size, tokens, scan_seconds, parse_seconds):
+        self.path = path
+        self.status = status
+        self.size = size
+        self.tokens = tokens
+        self.scan_seconds = scan_seconds
+        self.parse_seconds = parse_seconds
+
+
+"""One file to process: where to read it, where to write its output,
+and the options for the Parser. Jobs are sent to the worker processes."""
+class BatchJob:
+    __slots__ = ('path', 'output_path', 'token_path', 'options')
+
+    def __init__(self, path, output_path, token_path, options):
+        self.path = path
+        self.output_path = output_path
+        self.token_path = token_path
+        self.options = options
+
+
+## Expands the inputs into a sorted list of files without duplicates.
+## Sorting keeps the order of the jobs and of the summary the same on every run
+def find_inputs(inputs):
+    paths = set()
+    for input in inputs:
+        if os.path.isdir(input):
+            for directory, _, names in os.walk(input):
+                paths.update(os.path.join(directory, name) for name in names if name.endswith(INPUT_EXTENSIONS))
+        elif os.path.isfile(input):
+            paths.add(input)
+        else:
+            paths.update(path for path in glob.glob(input, recursive=True) if os.path.isfile(path))
+    return sorted(os.path.normpath(path) for path in paths)
+
+## Makes a job for every input, each writing to the same relative path under output_directory.
+## Paths are taken relative to the deepest directory holding all the inputs.
+## write_token_files is None, 'text' for the ScannerOutput format or 'binary' for token files
+def make_jobs(paths, output_directory, write_token_files=None, **options):
+    if not paths:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    jobs = []
+    for path in paths:
+        relative = os.path.relpath(os.path.abspath(path), root)
+        output_path = os.path.join(output_directory, relative)
+        if os.path.abspath(output_path) == os.path.abspath(path):
+            raise ValueError(f"The output for '{path}' would overwrite it, choose another output directory")
+        token_path = None
+        if write_token_files == 'text':
+            token_path = output_path + '.tokens'
+        elif write_token_files == 'binary':
+            token_path = output_path + '.jtok'
+        jobs.append(BatchJob(path, output_path, token_path, options))
+    return jobs
+
+## Scans and parses one file and writes its output, the same way
+## JsonScanner.main and JsonParser.main handle their files.
+## Errors are written to the output file instead of being raised, so one bad
+## file doesn't stop the batch
+def run_job(job):
+    os.makedirs(os.path.dirname(job.output_path) or '.', exist_ok=True)
+    size = 0
+
+    start = time.perf_counter()
+    try:
+        ## sizes are counted in bytes, not in decoded characters, so the MB/sec is right for any text
+        size = os.path.getsize(job.path)
+        with open(job.path, 'r') as file:
+            input_string = file.read().strip()
+        tokens = Lexer(record_symbols=False).tokenize(input_string)
+    except Exception:
+        with open(job.output_path, 'w') as f:
+            f.write(traceback.format_exc())
+        return BatchResult(job.path, 'scan error', size, 0, time.perf_counter() - start, 0.0)
+    scan_seconds = time.perf_counter() - start
+
+    if job.token_path is not None and job.token_path.endswith('.jtok'):
+        with open(job.token_path, 'wb') as f:
+            write_token_file(tokens, f)
+    elif job.token_path is not None:
+        with open(job.token_path, 'w') as f:
+            write_tokens(tokens, f)
+
+    start = time.perf_counter()
+    try:
+        parsed_value = Parser(tokens, **job.options).parse()
+        status = 'ok'
+    except Exception as e:
+        parsed_value = e
+        status = 'parse error'
+    with open(job.output_path, 'w') as f:
+        ## the tree is streamed into the file rather than built as one string
+        if isinstance(parsed_value, JSONValue):
+            parsed_value.write(f)
+        else:
+            f.write(repr(parsed_value))
+    parse_seconds = time.perf_counter() - start
+
+    return BatchResult(job.path, status, size, len(tokens), scan_seconds, parse_seconds)
+
+## Runs every job, on a pool of worker processes unless workers is 1.
+## Jobs are handed out chunksize at a time, and the results come back in the order of the jobs
+def run_batch(jobs, workers=None, chunksize=1):
+    if workers == 1:
+        return [run_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_job, jobs, chunksize=chunksize))
+
+## Prints every file that didn't parse, then the totals and throughput of the batch
+def print_summary(results, seconds, file=None):
+    counts = {'ok': 0, 'scan error': 0, 'parse error': 0}
+    for result in results:
+        counts[result.status] += 1
+        if result.status != 'ok':
+            print(f"{result.status:>12}: {result.path}", file=file)
+
+    size = sum(result.size for result in results)
+    tokens = sum(result.tokens for result in results)
+    scan_seconds = sum(result.scan_seconds for result in results)
+    parse_seconds = sum(result.parse_seconds for result in results)
+    print(f"{len(results)} files: {counts['ok']} parsed, {counts['scan error']} scan errors, {counts['parse error']} parse errors", file=file)
+    print(f"{size / MEGABYTE:.2f} MB, {tokens} tokens in {seconds:.3f}s "
+          f"({size / MEGABYTE / seconds:.2f} MB/sec, {tokens / seconds:,.0f} tokens/sec)", file=file)
+    print(f"worker time: {scan_seconds:.3f}s scanning, {parse_seconds:.3f}s parsing and writing", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='files, directories or glob patterns')
+    parser.add_argument('--out', required=True, help='directory the output files are written to')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, one per CPU by default')
+    parser.add_argument('--chunksize', type=int, default=1, help='files handed to a worker at a time')
+    parser.add_argument('--tokens', nargs='?', const='text', choices=['text', 'binary'],
+                        help='also write each file\'s tokens, in the ScannerOutput format or as a binary token file')
+    parser.add_argument('--engine', choices=Parser.ENGINES, default='recursive')
+    parser.add_argument('--rules', choices=list(RULE_PROFILES), default='strict', help='semantic rule profile')
+    args = parser.parse_args()
+
+    paths = find_inputs(args.inputs)
+    jobs = make_jobs(paths, args.out, args.tokens, engine=args.engine, rules=args.rules)
+    if not jobs:
+        print("No input files found")
+        return
+
+    start = time.perf_counter()
+    results = run_batch(jobs, args.workers, args.chunksize)
+    print_summary(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1165 @@
+"""Benchmarks for the scanner and parser.
+
+Each benchmark is a subcommand, for example:
+    python JsonBenchmark.py scanner --sizes 1 10 100
+Sizes are given in megabytes of synthetic JSON input."""
+import argparse
+import asyncio
+import gc
+import glob
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import tempfile
+import time
+import tracemalloc
+
+from JsonScanner import Lexer, Token, TokenType, EndOfInputError, TokenFile, write_tokens, write_token_file
+from JsonCorpus import CorpusGenerator
+from JsonMetrics import Metrics
+from JsonStream import parse_records, stream_records
+from JsonLazy import parse_lazy, parse_lazy_text
+from JsonQuery import extract_text
+from JsonEvents import EventHandler, TreeHandler, parse_events
+from JsonCache import ParseCache
+from JsonIncremental import IncrementalDocument
+from JsonAsync import parse_async
+from JsonParser import Parser, Tokenizer, parse_text, parse_file, UnexpectedTokenError, ListTypeError, EmptyListError, DuplicateKeyError, ValueType, SEMANTIC_RULES, numpy
+
+MEGABYTE = 1024 * 1024
+
+## Words used to fill synthetic string values
+WORDS = ['apple', 'grape', 'burger', 'banana', 'tape', 'sun', 'sensor',
+         'reading', 'value', 'north', 'south', 'alpha', 'omega', 'delta']
+
+
+"""The character-by-character scanning path the Lexer used before strings and
+numbers were sliced out of the input. It is kept here so the benchmarks can
+compare the current Lexer against it."""
+class CharLexer(Lexer):
+    def recognize_string(self):
+        states={
+            "START":0,
+            "STRING":1,
+            "END":3,
+            "REJECTED":4
+        }
+        result = ''
+        current_state = states['START']
+        final_state = states['END']
+
+        while self.current_char is not None and current_state != states['END']:
+            if current_state == states["START"] and self.current_char == '"':
+                current_state = states['STRING']
+            elif current_state == states['STRING']:
+                if self.current_char == '"':
+                    current_state = states['END']
+            else:
+                current_state = states['REJECTED']
+
+            if current_state == states['REJECTED']:
+                break
+
+            if self.current_char!='"':
+                result+= self.current_char
+            self.advance()
+
+        if current_state != final_state:
+            if len(result)==0:
+                raise EndOfInputError(self.position, self.current_char)
+            else:
+                raise EndOfInputError(self.position, result)
+
+        self.symbol_table[result] = TokenType.STRING
+        return Token(TokenType.STRING, result)
+
+    def recognize_num(self):
+        result = ''
+
+        while self.current_char is not None and (self.current_char.isdigit() or self.current_char in ['+','-','.','e']):
+            result+=self.current_char
+            self.advance()
+
+        return Token(TokenType.NUM, result)
+
+
+## Builds one synthetic record. Records mix long text fields with numbers,
+## booleans, null and a short list so every token type is exercised.
+def synthetic_record(rng, index, max_text):
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, max_text // 6 + 1)))
+    return (
+        '{'
+        f'"id": {index}, '
+        f'"name": "{text}", '
+        f'"score": {rng.uniform(-1000, 1000):.4f}, '
+        f'"tags": ["{rng.choice(WORDS)}", "{rng.choice(WORDS)}"], '
+        f'"active": {rng.choice(["true", "false"])}, '
+        '"parent": null'
+        '}'
+    )
+
+## Builds a list of records that is at least `size` characters long
+def synthetic_document(size, seed=0, max_text=4096):
+    rng = random.Random(seed)
+    parts = []
+    length = 2
+    index = 0
+    while length < size:
+        record = synthetic_record(rng, index, max_text)
+        parts.append(record)
+        length += len(record) + 2
+        index += 1
+    return '[' + ',\n'.join(parts) + ']'
+
+
+## Runs `function` and returns its result along with the elapsed seconds
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_scanner(args):
+    print(f"{'size':>8} {'lexer':>10} {'tokens':>10} {'seconds':>9} {'tokens/sec':>12}")
+    for size in args.sizes:
+        text = synthetic_document(int(size * MEGABYTE), args.seed)
+        lexers = [('sliced', Lexer())]
+        if not args.skip_char:
+            lexers.append(('char', CharLexer()))
+        for name, lexer in lexers:
+            tokens, seconds = timed(lexer.tokenize, text)
+            print(f"{size:>6}MB {name:>10} {len(tokens):>10} {seconds:>9.3f} {len(tokens) / seconds:>12,.0f}")
+            del tokens
+
+
+## The scanner and parser connected through a ScannerOutput file,
+## the way JsonParser.main runs them
+def parse_round_trip(text, path):
+    tokens = Lexer().tokenize(text)
+    with open(path, 'w') as file:
+        write_tokens(tokens, file)
+    with open(path, 'r') as file:
+        return Parser(file.read()).parse()
+
+## Runs a parse function, treating a parse error as a finished parse
+def parse_or_error(function, *args):
+    try:
+        return function(*args)
+    except Exception as e:
+        return e
+
+def bench_pipeline(args):
+    inputs = []
+    for file_name in sorted(glob.glob('ScannerInputs/*.txt')):
+        with open(file_name, 'r') as file:
+            inputs.append(file.read().strip())
+    documents = [('ScannerInputs x' + str(args.repeat), inputs * args.repeat)]
+    for size in args.sizes:
+        documents.append((f'{size}MB synthetic', [synthetic_document(int(size * MEGABYTE), args.seed)]))
+
+    print(f"{'input':>22} {'file round trip':>16} {'in memory':>10} {'saved':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ScannerOutput.txt')
+        for name, texts in documents:
+            _, round_trip = timed(lambda: [parse_or_error(parse_round_trip, text, path) for text in texts])
+            _, in_memory = timed(lambda: [parse_or_error(parse_text, text) for text in texts])
+            print(f"{name:>22} {round_trip:>15.3f}s {in_memory:>9.3f}s {1 - in_memory / round_trip:>7.0%}")
+
+
+## Counts the tokens of a file read into a str, the way JsonScanner.main reads files.
+## The symbol table is left off in both scanning modes so only the input itself is measured
+def count_text_tokens(path):
+    with open(path, 'r') as file:
+        text = file.read().strip()
+    return sum(1 for _ in Lexer(record_symbols=False).iter_tokens(text))
+
+## Counts the tokens of a file scanned as bytes through a memory map
+def count_mapped_tokens(path):
+    return sum(1 for _ in Lexer(record_symbols=False).iter_file_tokens(path))
+
+## Runs one scan in this process, returning tokens and seconds from an untraced run,
+## then the tracemalloc peak of a traced run and the peak resident set size in bytes
+def measure_scan(function, path):
+    tokens, seconds = timed(function, path)
+    tracemalloc.start()
+    function(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return tokens, seconds, peak, peak_rss()
+
+## Peak resident set size of this process in bytes. On Linux this is read from
+## /proc because ru_maxrss carries over the parent's peak into a spawned process
+def peak_rss():
+    try:
+        with open('/proc/self/status', 'r') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def bench_mapped(args):
+    ## every measurement runs in a freshly spawned process so resident memory isn't shared between them
+    context = multiprocessing.get_context('spawn')
+    print(f"{'size':>8} {'mode':>7} {'tokens':>10} {'seconds':>9} {'MB/sec':>8} {'heap peak':>10} {'max RSS':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f'input{size}.txt')
+            with open(path, 'w') as file:
+                file.write(synthetic_document(int(size * MEGABYTE), args.seed))
+            megabytes = os.path.getsize(path) / MEGABYTE
+            for name, function in [('str', count_text_tokens), ('mmap', count_mapped_tokens)]:
+                with context.Pool(1) as pool:
+                    tokens, seconds, peak, rss = pool.apply(measure_scan, (function, path))
+                print(f"{size:>6}MB {name:>7} {tokens:>10} {seconds:>9.3f} {megabytes / seconds:>8.1f} "
+                      f"{peak / MEGABYTE:>8.1f}MB {rss / MEGABYTE:>8.1f}MB")
+            os.remove(path)
+
+
+## python JsonChecks.py backends checks that the backends agree
+def bench_backends(args):
+    print(f"{'size':>8} {'backend':>8} {'tokens':>10} {'seconds':>9} {'tokens/sec':>12}")
+    for size in args.sizes:
+        text = synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)
+        for backend in Lexer.BACKENDS:
+            count, seconds = timed(lambda: sum(1 for _ in Lexer(backend=backend).iter_tokens(text)))
+            print(f"{size:>6}MB {backend:>8} {count:>10} {seconds:>9.3f} {count / seconds:>12,.0f}")
+
+
+"""Token as it was before it had __slots__, for measuring the memory per token"""
+class DictToken:
+    def __init__(self, type, value):
+        self.type = type
+        self.value = value
+
+## Bytes of traced memory still held after running function, and its result
+def retained_memory(function):
+    tracemalloc.start()
+    result = function()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, retained
+
+def bench_tokens(args):
+    print(f"{'size':>8} {'storage':>22} {'tokens':>10} {'bytes/token':>12} {'parse seconds':>14}")
+    for size in args.sizes:
+        text = synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)
+        layouts = [
+            ('Token with __dict__', lambda: [DictToken(token.type, token.value) for token in Lexer().iter_tokens(text)]),
+            ('Token with __slots__', lambda: Lexer().tokenize(text)),
+            ('TokenBuffer', lambda: Lexer().tokenize_compact(text)),
+        ]
+        for name, build in layouts:
+            tokens, retained = retained_memory(build)
+            _, seconds = timed(lambda: Parser(tokens).parse())
+            print(f"{size:>6}MB {name:>22} {len(tokens):>10} {retained / len(tokens):>12.1f} {seconds:>14.3f}")
+            del tokens
+
+
+## A list of whole numbers of about size bytes, where nearly every value is a scalar
+def numeric_document(size, seed=0):
+    rng = random.Random(seed)
+    parts = []
+    length = 2
+    while length < size:
+        part = str(rng.randint(0, 10 ** 9))
+        parts.append(part)
+        length += len(part) + 1
+    return '[' + ','.join(parts) + ']'
+
+## Bytes of traced memory at the peak of running function, and its result
+def peak_memory(function):
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak
+
+def bench_native(args):
+    print(f"{'input':>20} {'output':>10} {'seconds':>9} {'peak MB':>9}")
+    for size in args.sizes:
+        documents = [
+            (f'{size}MB synthetic', synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)),
+            (f'{size}MB numeric', numeric_document(int(size * MEGABYTE), args.seed)),
+        ]
+        for name, text in documents:
+            ## the tokens are built first so only the parser's own work is measured
+            tokens = Lexer(record_symbols=False).tokenize(text)
+            for output, native in [('JSONValue', False), ('native', True)]:
+                _, seconds = timed(lambda: Parser(tokens, native=native).parse())
+                _, peak = peak_memory(lambda: Parser(tokens, native=native).parse())
+                print(f"{name:>20} {output:>10} {seconds:>9.3f} {peak / MEGABYTE:>9.1f}")
+            del tokens
+
+
+## A list nested depth levels deep around a single number
+def nested_document(depth):
+    return '[' * depth + '1' + ']' * depth
+
+def bench_writer(args):
+    print(f"{'input':>20} {'writer':>16} {'seconds':>9} {'peak MB':>9}")
+    documents = [(f'{size}MB synthetic', synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)) for size in args.sizes]
+    documents.append((f'depth {args.depth}', nested_document(args.depth)))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ParserOutput.txt')
+        for name, text in documents:
+            value = parse_or_error(lambda: Parser(Lexer().iter_tokens(text)).parse())
+            if isinstance(value, Exception):
+                print(f"{name:>20} could not be parsed: {value!r}")
+                continue
+            def recursive():
+                with open(path, 'w') as file:
+                    file.write(value.recursive_print(0))
+            def streamed():
+                with open(path, 'w') as file:
+                    value.write(file)
+            for writer, function in [('recursive_print', recursive), ('write', streamed)]:
+                result, seconds = timed(parse_or_error, function)
+                if isinstance(result, Exception):
+                    print(f"{name:>20} {writer:>16} {type(result).__name__}")
+                    continue
+                _, peak = peak_memory(function)
+                print(f"{name:>20} {writer:>16} {seconds:>9.3f} {peak / MEGABYTE:>9.1f}")
+
+
+## A dictionary nested depth levels deep, each level holding a list and the next level
+def nested_dict_document(depth):
+    return '{"a":[1,2],"b":' * depth + '1' + '}' * depth
+
+def bench_engines(args):
+    print(f"{'input':>20} {'engine':>10} {'seconds':>9} {'result':>16}")
+    documents = [(f'{size}MB synthetic', synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)) for size in args.sizes]
+    for depth in args.depths:
+        documents.append((f'depth {depth} lists', nested_document(depth)))
+        documents.append((f'depth {depth} dicts', nested_dict_document(depth)))
+    for name, text in documents:
+        tokens = Lexer(record_symbols=False).tokenize(text)
+        for engine in Parser.ENGINES:
+            result, seconds = timed(parse_or_error, lambda: Parser(tokens, engine=engine).parse())
+            outcome = type(result).__name__ if isinstance(result, Exception) else 'parsed'
+            print(f"{name:>20} {engine:>10} {seconds:>9.3f} {outcome:>16}")
+        del tokens
+
+
+"""The exception-based error recovery Parser used before it looked at the current
+token first. It is kept here so the benchmarks can compare recovery costs."""
+class RaisingParser(Parser):
+    def parse_pair(self):
+        key = self.current_token.value
+        try:
+            token = self.eat(TokenType.STRING)
+        except UnexpectedTokenError as e:
+            if e.given_type == TokenType.RBRACE or e.given_type == TokenType.COMMA:
+                return None
+            else:
+                raise e
+        try:
+            try:
+                self.eat(TokenType.COLON)
+            except UnexpectedTokenError:
+                self.eat(TokenType.SEMICOLON)
+            value = self.parse_value()
+        except UnexpectedTokenError as e:
+            if e.given_type == TokenType.RBRACE:
+                value = self.build(ValueType.NULL, None)
+            else:
+                raise e
+        return (key, value)
+
+    def parse_list(self):
+        self.eat(TokenType.LBRACKET)
+        list = []
+        type = ""
+        while True:
+            try:
+                list.append(self.parse_value())
+                if type == "":
+                    type = self.type_of(list[-1])
+                elif type != self.type_of(list[-1]):
+                    raise ListTypeError(self.value_of(list[-1]))
+            except UnexpectedTokenError as e:
+                if e.given_type != TokenType.COMMA and e.given_type != TokenType.RBRACKET:
+                    raise e
+            if self.current_token.type != TokenType.COMMA:
+                break
+            self.eat(TokenType.COMMA)
+        self.eat(TokenType.RBRACKET)
+        if len(list)==0:
+            raise EmptyListError(self.tokenizer.current_index, self.current_token.type)
+        return list
+
+## A synthetic document full of the mistakes the parser recovers from:
+## stray commas in lists and missing values before a closing brace
+def dirty_document(size, seed=0, max_text=4096):
+    text = synthetic_document(size, seed, max_text)
+    return text.replace('["', '[,"').replace('"], ', '",,], ').replace('"parent": null', '"parent":')
+
+## A synthetic document where every record has errors that stop a strict parse
+def invalid_document(size, seed=0, max_text=4096):
+    text = synthetic_document(size, seed, max_text)
+    return text.replace('"active"', '"id"').replace('"parent": null', '"parent": "null"')
+
+def bench_recovery(args):
+    print(f"{'input':>20} {'parser':>22} {'seconds':>9} {'diagnostics':>12}")
+    for size in args.sizes:
+        text = dirty_document(int(size * MEGABYTE), args.seed, args.max_text)
+        tokens = Lexer(record_symbols=False).tokenize(text)
+        parsers = [
+            ('raising recovery', lambda: RaisingParser(tokens).parse()),
+            ('lookahead recursive', lambda: Parser(tokens).parse()),
+            ('lookahead iterative', lambda: Parser(tokens, engine='iterative').parse()),
+        ]
+        for name, function in parsers:
+            _, seconds = timed(function)
+            print(f"{size:>6}MB dirty {name:>22} {seconds:>9.3f} {0:>12}")
+
+        text = invalid_document(int(size * MEGABYTE), args.seed, args.max_text)
+        tokens = Lexer(record_symbols=False).tokenize(text)
+        error, seconds = timed(parse_or_error, lambda: Parser(tokens).parse())
+        print(f"{size:>6}MB invalid {'strict, first error':>20} {seconds:>9.3f} {1:>12}")
+        (_, diagnostics), seconds = timed(lambda: Parser(tokens).parse_with_diagnostics())
+        print(f"{size:>6}MB invalid {'collect':>20} {seconds:>9.3f} {len(diagnostics):>12}")
+        del tokens
+
+
+## One dictionary with `width` different keys
+def wide_document(width):
+    return '{' + ','.join(f'"key{index}":{index}' for index in range(width)) + '}'
+
+## Duplicate key detection the way it was done before, by scanning a list of the keys seen so far
+def check_duplicate_key_list(parser, dictionary, key):
+    if key in list(dictionary):
+        parser.report(DuplicateKeyError(key))
+
+def bench_rules(args):
+    documents = [(f'{size}MB synthetic', synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)) for size in args.sizes]
+    documents += [(f'{size}MB numeric', numeric_document(int(size * MEGABYTE), args.seed)) for size in args.sizes]
+    documents.append((f'{args.width} keys', wide_document(args.width)))
+
+    print(f"{'input':>20} {'rules':>20} {'seconds':>9} {'cost':>8}")
+    for name, text in documents:
+        tokens = Lexer(record_symbols=False).tokenize(text)
+        configs = [('trusted', 'trusted', None)]
+        configs += [(rule, [rule], None) for rule in SEMANTIC_RULES]
+        configs.append(('strict', 'strict', None))
+        if text.startswith('{'):
+            configs.append(('duplicate_key (list)', ['duplicate_key'], (check_duplicate_key_list,)))
+
+        ## every configuration is run in turn, a few times over, with the garbage
+        ## collector off. The fastest run of each is kept so the small per-rule
+        ## costs aren't lost in noise
+        best = {}
+        for _ in range(args.repeat):
+            for label, rules, pair_checks in configs:
+                parser = Parser(tokens, rules=rules)
+                if pair_checks is not None:
+                    parser.pair_checks = pair_checks
+                gc.collect()
+                gc.disable()
+                seconds = timed(parser.parse)[1]
+                gc.enable()
+                best[label] = min(seconds, best.get(label, seconds))
+
+        trusted = best['trusted']
+        for label, _, _ in configs:
+            cost = '' if label == 'trusted' else f"{(best[label] - trusted) / trusted:+.1%}"
+            print(f"{name:>20} {label:>20} {best[label]:>9.3f} {cost:>8}")
+        del tokens
+
+
+## The points of each sweep of the benchmark suite. Every point changes one
+## setting of the corpus generator and keeps the others at the suite's defaults
+def suite_points(args):
+    base = {'size': args.base_size, 'depth': args.depth, 'width': args.width, 'string_length': args.string_length}
+    points = []
+    for sweep, values in [('size', args.sizes), ('depth', args.depths), ('width', args.widths), ('string_length', args.string_lengths)]:
+        for value in values:
+            points.append((sweep, dict(base, **{sweep: value})))
+    return points
+
+## Times each stage of the pipeline on one document, along with json.loads
+## as a baseline. Peak memory of scanning and parsing comes from a separate
+## traced run so tracing doesn't slow down the timed stages
+def measure_stages(text):
+    stages = {}
+    tokens, stages['scan'] = timed(Lexer(record_symbols=False).tokenize, text)
+    output = io.StringIO()
+    write_tokens(tokens, output)
+    token_text = output.getvalue()
+    _, stages['tokenizer'] = timed(Tokenizer, token_text)
+    value, stages['parse'] = timed(lambda: Parser(tokens).parse())
+    _, stages['print'] = timed(repr, value)
+    _, stages['json.loads'] = timed(json.loads, text)
+    count = len(tokens)
+    del tokens, value, token_text, output
+
+    _, peak = peak_memory(lambda: Parser(Lexer(record_symbols=False).tokenize(text)).parse())
+    return count, stages, peak
+
+def bench_suite(args):
+    results = []
+    print(f"{'sweep':>14} {'value':>8} {'MB':>7} {'tokens':>10} {'scan':>8} {'tokenizer':>10} {'parse':>8} {'print':>8} {'json.loads':>11} {'tokens/sec':>11} {'peak MB':>8}")
+    for sweep, point in suite_points(args):
+        generator = CorpusGenerator(args.seed, point['depth'], point['width'], point['string_length'])
+        text = generator.document(int(point['size'] * MEGABYTE))
+        count, stages, peak = measure_stages(text)
+        ## tokens per second through the whole pipeline, scanning to the parsed tree
+        throughput = count / (stages['scan'] + stages['parse'])
+        results.append({
+            'sweep': sweep, 'value': point[sweep], 'parameters': point,
+            'bytes': len(text), 'tokens': count, 'seconds': stages,
+            'tokens_per_sec': throughput, 'peak_bytes': peak,
+        })
+        print(f"{sweep:>14} {point[sweep]:>8} {len(text) / MEGABYTE:>7.2f} {count:>10} {stages['scan']:>8.3f} {stages['tokenizer']:>10.3f} "
+              f"{stages['parse']:>8.3f} {stages['print']:>8.3f} {stages['json.loads']:>11.3f} {throughput:>11,.0f} {peak / MEGABYTE:>8.1f}")
+
+    if args.output:
+        run = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': args.seed,
+            'results': results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(run, file, indent=2)
+        print(f"results saved to {args.output}")
+
+## Compares two saved suite runs, showing the time of each stage
+## in the new run as a change from the old one
+def bench_compare(args):
+    with open(args.old) as file:
+        old = {(result['sweep'], result['value']): result for result in json.load(file)['results']}
+    with open(args.new) as file:
+        new = json.load(file)['results']
+
+    stages = ['scan', 'tokenizer', 'parse', 'print', 'json.loads']
+    print(f"{'sweep':>14} {'value':>8} " + ' '.join(f'{stage:>10}' for stage in stages) + f" {'peak':>8}")
+    for result in new:
+        before = old.get((result['sweep'], result['value']))
+        if before is None:
+            print(f"{result['sweep']:>14} {result['value']:>8} not in {args.old}")
+            continue
+        changes = [result['seconds'][stage] / before['seconds'][stage] - 1 for stage in stages]
+        peak = result['peak_bytes'] / before['peak_bytes'] - 1
+        print(f"{result['sweep']:>14} {result['value']:>8} " + ' '.join(f'{change:>+10.1%}' for change in changes) + f" {peak:>+8.1%}")
+
+
+def bench_metrics(args):
+    print(f"{'input':>20} {'instrumentation':>24} {'seconds':>9} {'cost':>8}")
+    for size in args.sizes:
+        documents = [
+            (f'{size}MB synthetic', synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)),
+            (f'{size}MB dirty', dirty_document(int(size * MEGABYTE), args.seed, args.max_text)),
+        ]
+        for name, text in documents:
+            tokens = Lexer(record_symbols=False).tokenize(text)
+            configs = [
+                ## parse_document is Parser.parse without its one check for metrics
+                ('none (parse_document)', lambda: Parser(tokens).parse_document()),
+                ('disabled', lambda: Parser(tokens).parse()),
+                ('enabled', lambda: Parser(tokens, metrics=Metrics()).parse()),
+                ('enabled, tracemalloc', lambda: Parser(tokens, metrics=Metrics(trace_memory=True)).parse()),
+            ]
+            ## each configuration runs in turn, and the fastest of the runs is kept
+            best = {}
+            for _ in range(args.repeat):
+                for label, function in configs:
+                    gc.collect()
+                    seconds = timed(function)[1]
+                    best[label] = min(seconds, best.get(label, seconds))
+            base = best['none (parse_document)']
+            for label, _ in configs:
+                print(f"{name:>20} {label:>24} {best[label]:>9.3f} {(best[label] - base) / base:>+8.1%}")
+            del tokens
+
+
+## Short newline-delimited records from the corpus generator, with every tenth record cut short.
+## Small records are where the cost of setting up each parse shows
+def record_lines(count, seed=0):
+    generator = CorpusGenerator(seed, depth=1, width=4, string_length=16)
+    lines = []
+    for index in range(count):
+        record = generator.record()
+        lines.append(record[:len(record) // 2] if index % 10 == 9 else record)
+    return lines
+
+## What the stream mode replaces: a new Lexer and Parser for every line
+def parse_lines_separately(lines):
+    results = []
+    for line in lines:
+        try:
+            results.append(Parser(Lexer().iter_tokens(line)).parse())
+        except Exception as e:
+            results.append(e)
+    return results
+
+def bench_stream(args):
+    print(f"{'records':>8} {'mode':>30} {'seconds':>9} {'records/sec':>12}")
+    for count in args.counts:
+        lines = record_lines(count, args.seed)
+        configs = [
+            ('new Lexer and Parser per line', lambda: parse_lines_separately(lines)),
+            ('one RecordParser', lambda: list(parse_records(lines))),
+        ]
+        for workers in args.workers:
+            configs.append((f'{workers} workers, ordered', lambda workers=workers: list(stream_records(lines, workers, True, args.chunksize))))
+            configs.append((f'{workers} workers, unordered', lambda workers=workers: list(stream_records(lines, workers, False, args.chunksize))))
+        for label, function in configs:
+            seconds = timed(function)[1]
+            print(f"{count:>8} {label:>30} {seconds:>9.3f} {count / seconds:>12,.0f}")
+
+
+## A document with a small header in front of a large list of records
+def headed_document(size, seed=0, max_text=4096):
+    return '{"meta": {"source": "benchmark", "seed": ' + str(seed) + '}, "items": ' + synthetic_document(size, seed, max_text) + '}'
+
+## Reads the two header fields, the access pattern lazy parsing is for
+def read_header(document):
+    meta = document.value['meta'].value
+    return meta['source'].value, meta['seed'].value
+
+def bench_lazy(args):
+    print(f"{'input':>12} {'parse':>32} {'seconds':>9} {'peak MB':>9}")
+    for size in args.sizes:
+        text = headed_document(int(size * MEGABYTE), args.seed, args.max_text)
+        ## the tokens are built first so only the parser's own work is measured,
+        ## then the whole pipeline is timed from the text
+        token_list = Lexer(record_symbols=False).tokenize(text)
+        token_buffer = Lexer(record_symbols=False).tokenize_compact(text)
+        configs = [
+            ('eager, token list', lambda: read_header(Parser(token_list).parse())),
+            ('lazy, token list', lambda: read_header(parse_lazy(token_list))),
+            ('eager, TokenBuffer', lambda: read_header(Parser(token_buffer).parse())),
+            ('lazy, TokenBuffer', lambda: read_header(parse_lazy(token_buffer))),
+            ('lazy, TokenBuffer, load()', lambda: read_header(parse_lazy(token_buffer).load())),
+            ('eager from text (parse_text)', lambda: read_header(parse_text(text))),
+            ('lazy from text (parse_lazy_text)', lambda: read_header(parse_lazy_text(text))),
+        ]
+        for label, function in configs:
+            gc.collect()
+            result, seconds = timed(function)
+            _, peak = peak_memory(function)
+            assert result == ('benchmark', args.seed)
+            print(f"{f'{size}MB':>12} {label:>32} {seconds:>9.3f} {peak / MEGABYTE:>9.1f}")
+        del token_list, token_buffer
+
+
+## The values at the paths, read from a fully parsed document, as the query API replaces
+def select_after_parsing(text, paths):
+    document = parse_text(text, native=True)
+    results = []
+    for path in paths:
+        segments = path.split('/')[1:]
+        values = [document]
+        for segment in segments:
+            if segment == '*':
+                values = [item for value in values for item in (value.values() if isinstance(value, dict) else value)]
+            else:
+                values = [value[segment] if isinstance(value, dict) else value[int(segment)] for value in values]
+        results.extend(values)
+    return results
+
+def bench_query(args):
+    print(f"{'input':>8} {'paths':>28} {'method':>24} {'values':>8} {'seconds':>9} {'peak MB':>9}")
+    for size in args.sizes:
+        text = headed_document(int(size * MEGABYTE), args.seed, args.max_text)
+        for paths in [['/meta/seed'], ['/items/*/score'], ['/items/*/tags/0', '/items/*/id']]:
+            configs = [
+                ('parse_text, then select', lambda: len(select_after_parsing(text, paths))),
+                ## the values are counted as they stream out rather than kept
+                ('extract_text', lambda: sum(1 for _ in extract_text(text, paths, native=True))),
+            ]
+            for label, function in configs:
+                gc.collect()
+                count, seconds = timed(function)
+                _, peak = peak_memory(function)
+                print(f"{f'{size}MB':>8} {' '.join(paths):>28} {label:>24} {count:>8} {seconds:>9.3f} {peak / MEGABYTE:>9.1f}")
+
+"""Adds up the score field of every record from the events, holding nothing else"""
+class ScoreTotal(EventHandler):
+    def __init__(self):
+        self.total = 0.0
+        self.in_score = False
+
+    def key(self, key):
+        self.in_score = key == 'score'
+
+    def scalar(self, type, value):
+        if self.in_score:
+            self.total += value
+            self.in_score = False
+
+    def result(self):
+        return self.total
+
+## The same total from a fully parsed document
+def score_total_after_parsing(text):
+    return sum(record['score'] for record in parse_text(text, native=True))
+
+def bench_events(args):
+    print(f"{'input':>8} {'method':>36} {'seconds':>9} {'peak MB':>9}")
+    for size in args.sizes:
+        text = synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)
+        configs = [
+            ('parse_text native, then sum', lambda: score_total_after_parsing(text)),
+            ('parse_text, iterative engine', lambda: parse_text(text, engine='iterative')),
+            ('events, ScoreTotal handler', lambda: parse_events(text, ScoreTotal())),
+            ('events, TreeHandler', lambda: parse_events(text, TreeHandler())),
+        ]
+        for label, function in configs:
+            gc.collect()
+            _, seconds = timed(function)
+            _, peak = peak_memory(function)
+            print(f"{f'{size}MB':>8} {label:>36} {seconds:>9.3f} {peak / MEGABYTE:>9.1f}")
+
+
+## Parses every file, keeping errors as results the way a batch run does
+def parse_all(paths, parse):
+    results = []
+    for path in paths:
+        try:
+            results.append(parse(path))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def bench_cache(args):
+    generator = CorpusGenerator(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for index in range(args.files):
+            path = os.path.join(directory, f'input{index:04d}.json')
+            with open(path, 'w') as file:
+                file.write(generator.document(int(args.size * 1024)))
+            paths.append(path)
+        cache_directory = os.path.join(directory, 'cache')
+        cache = ParseCache(capacity=args.files, directory=cache_directory)
+
+        runs = [
+            ('no cache', lambda: parse_all(paths, parse_file)),
+            ('cold cache', lambda: parse_all(paths, cache.parse_file)),
+            ('warm, memory tier', lambda: parse_all(paths, cache.parse_file)),
+            ('rerun, disk tier', lambda: parse_all(paths, ParseCache(capacity=0, directory=cache_directory).parse_file)),
+        ]
+        print(f"{args.files} files of {args.size}KB")
+        print(f"{'run':>34} {'seconds':>9}")
+        for label, function in runs:
+            print(f"{label:>34} {timed(function)[1]:>9.3f}")
+
+        ## a tenth of the files change before the last rerun
+        for path in paths[::10]:
+            with open(path, 'a') as file:
+                file.write(' ')
+        rerun = ParseCache(capacity=0, directory=cache_directory)
+        seconds = timed(lambda: parse_all(paths, rerun.parse_file))[1]
+        print(f"{'rerun, 10% of the files changed':>34} {seconds:>9.3f}  {rerun.stats}")
+        trusted = ParseCache(capacity=0, directory=cache_directory)
+        seconds = timed(lambda: parse_all(paths, lambda path: trusted.parse_file(path, rules='trusted')))[1]
+        print(f"{'rerun with other rules':>34} {seconds:>9.3f}  {trusted.stats}")
+
+
+def bench_tokenfile(args):
+    print(f"{'input':>20} {'format':>8} {'MB on disk':>11} {'write':>8} {'load':>8} {'parse':>8}")
+    for size in args.sizes:
+        documents = [
+            (f'{size}MB synthetic', synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)),
+            (f'{size}MB corpus', CorpusGenerator(args.seed).document(int(size * MEGABYTE))),
+        ]
+        for name, text in documents:
+            tokens = Lexer(record_symbols=False).tokenize(text)
+            with tempfile.TemporaryDirectory() as directory:
+                text_path = os.path.join(directory, 'tokens.txt')
+                binary_path = os.path.join(directory, 'tokens.jtok')
+
+                def write_text():
+                    with open(text_path, 'w') as file:
+                        write_tokens(tokens, file)
+                def write_binary():
+                    with open(binary_path, 'wb') as file:
+                        write_token_file(tokens, file)
+                ## loading reads every token into a list, as the Tokenizer does
+                def load_text():
+                    with open(text_path, 'r') as file:
+                        return Tokenizer(file.read()).tokens
+                def load_binary():
+                    with TokenFile(binary_path) as token_file:
+                        return list(token_file)
+                def parse_text_file():
+                    with open(text_path, 'r') as file:
+                        return Parser(file.read()).parse()
+                def parse_binary_file():
+                    with TokenFile(binary_path) as token_file:
+                        return Parser(token_file).parse()
+
+                for label, path, write, load, parse in [('text', text_path, write_text, load_text, parse_text_file),
+                                                        ('binary', binary_path, write_binary, load_binary, parse_binary_file)]:
+                    write_seconds = timed(write)[1]
+                    load_seconds = timed(load)[1]
+                    parse_seconds = timed(parse)[1]
+                    print(f"{name:>20} {label:>8} {os.path.getsize(path) / MEGABYTE:>11.2f} "
+                          f"{write_seconds:>8.3f} {load_seconds:>8.3f} {parse_seconds:>8.3f}")
+            del tokens
+
+
+## Parses the text from scratch, as the editing tools did before incremental parsing
+def parse_from_scratch(text):
+    return Parser(Lexer(record_symbols=False).tokenize(text)).parse()
+
+## Edits that keep a synthetic document valid: one letter of a name is replaced, either
+## at random places or one after another at the same place, as when typing
+def letter_edits(text, count, rng, typing):
+    names = [match.start(1) for match in re.finditer(r'"name": "([^"]+)"', text)]
+    if typing:
+        offset = rng.choice(names)
+        return [(offset + index % 4, 1, rng.choice(WORDS)[0]) for index in range(count)]
+    return [(rng.choice(names), 1, rng.choice(WORDS)[0]) for _ in range(count)]
+
+def bench_incremental(args):
+    rng = random.Random(args.seed)
+    print(f"{'input':>8} {'edits':>8} {'method':>24} {'ms per edit':>12} {'tokens parsed':>14}")
+    for size in args.sizes:
+        text = synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)
+        seconds = timed(lambda: [parse_from_scratch(text) for _ in range(args.full)])[1]
+        print(f"{f'{size}MB':>8} {'any':>8} {'tokenize and parse':>24} {seconds / args.full * 1000:>12.2f}")
+        document, seconds = timed(IncrementalDocument, text)
+        print(f"{f'{size}MB':>8} {'load':>8} {'IncrementalDocument':>24} {seconds * 1000:>12.2f}")
+
+        for label, typing in [('typing', True), ('random', False)]:
+            edits = letter_edits(document.text, args.edits, rng, typing)
+            parsed = document.stats['tokens_parsed']
+            seconds = timed(lambda: [document.edit(*edit) for edit in edits])[1]
+            parsed = (document.stats['tokens_parsed'] - parsed) / len(edits)
+            print(f"{f'{size}MB':>8} {label:>8} {'IncrementalDocument.edit':>24} {seconds / len(edits) * 1000:>12.2f} {parsed:>14.1f}")
+        assert repr(document.value) == repr(parse_from_scratch(document.text))
+
+
+## The q quantile of a list of numbers
+def quantile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+## Serves connections on the loopback interface that each send one document and read
+## back its number of records, while a probe measures how late the event loop wakes it.
+## mode is 'blocking' (read everything, then parse_text), 'thread' (parse_text in a worker
+## thread) or 'async' (parse_async as the data arrives, with the budget)
+async def serve_loopback(mode, connections, payload, budget, interval):
+    async def handle(reader, writer):
+        if mode == 'async':
+            value = await parse_async(reader, budget=budget, native=True)
+        else:
+            text = (await reader.read()).decode('utf-8')
+            if mode == 'thread':
+                value = await asyncio.to_thread(parse_text, text, native=True)
+            else:
+                value = parse_text(text, native=True)
+        writer.write(b'%d\n' % len(value))
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    async def client(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for start in range(0, len(payload), 65536):
+            writer.write(payload[start:start + 65536])
+            await writer.drain()
+        writer.write_eof()
+        count = int(await reader.readline())
+        writer.close()
+        await writer.wait_closed()
+        return count
+
+    lags = []
+    running = True
+    async def probe():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    counts = await asyncio.gather(*[client(port) for _ in range(connections)])
+    seconds = time.perf_counter() - start
+    running = False
+    await probe_task
+    server.close()
+    await server.wait_closed()
+    return counts, seconds, lags
+
+def bench_async(args):
+    payload = synthetic_document(int(args.size * 1024), args.seed, args.max_text).encode('utf-8')
+    expected = len(parse_text(payload.decode('utf-8')).value)
+    configs = [('blocking', None), ('thread', None)] + [('async', budget) for budget in args.budgets]
+    print(f"documents of {args.size}KB, event loop probed every {args.interval}ms")
+    print(f"{'connections':>11} {'mode':>18} {'seconds':>9} {'docs/sec':>9} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for connections in args.connections:
+        for mode, budget in configs:
+            counts, seconds, lags = asyncio.run(serve_loopback(mode, connections, payload, budget, args.interval / 1000))
+            assert counts == [expected] * connections
+            label = mode if budget is None else f'{mode}, budget {budget}'
+            print(f"{connections:>11} {label:>18} {seconds:>9.3f} {connections / seconds:>9.1f} "
+                  f"{quantile(lags, 0.5) * 1000:>11.2f} {quantile(lags, 0.99) * 1000:>11.2f} {max(lags) * 1000:>11.2f}")
+
+
+## A sensor dump of about size bytes: records of readings, each with a list of
+## decimal samples, a list of whole-number counters and a list of flags
+def sensor_document(size, seed=0, samples=64):
+    rng = random.Random(seed)
+    records = []
+    length = 2
+    while length < size:
+        record = (f'{{"sensor": {len(records)}, '
+                  f'"samples": [{", ".join(f"{rng.uniform(-50, 50):.3f}" for _ in range(samples))}], '
+                  f'"counters": [{", ".join(str(rng.randint(0, 10 ** 6)) for _ in range(samples // 4))}], '
+                  f'"flags": [{", ".join(rng.choice(["true", "false"]) for _ in range(samples // 8))}]}}')
+        records.append(record)
+        length += len(record) + 2
+    return '[' + ', '.join(records) + ']'
+
+## A square matrix of decimals of about size bytes, one list per row
+def matrix_document(size, seed=0):
+    rng = random.Random(seed)
+    width = max(1, int((size / 8) ** 0.5))
+    rows = ('[' + ','.join(f'{rng.random():.5f}' for _ in range(width)) + ']' for _ in range(width))
+    return '[' + ','.join(rows) + ']'
+
+def bench_typed(args):
+    kinds = [('lists', False), ('array', 'array')] + ([('numpy', 'numpy')] if numpy is not None else [])
+    print(f"{'input':>16} {'output':>10} {'lists as':>8} {'seconds':>9} {'peak MB':>9}")
+    for size in args.sizes:
+        documents = [
+            (f'{size}MB sensors', sensor_document(int(size * MEGABYTE), args.seed)),
+            (f'{size}MB matrix', matrix_document(int(size * MEGABYTE), args.seed)),
+        ]
+        for name, text in documents:
+            ## the tokens are built first so only the parser's own work is measured
+            tokens = Lexer(record_symbols=False).tokenize(text)
+            for output, native in [('JSONValue', False), ('native', True)]:
+                printed = set()
+                for label, typed_arrays in kinds:
+                    value, seconds = timed(lambda: Parser(tokens, native=native, typed_arrays=typed_arrays).parse())
+                    _, peak = peak_memory(lambda: Parser(tokens, native=native, typed_arrays=typed_arrays).parse())
+                    print(f"{name:>16} {output:>10} {label:>8} {seconds:>9.3f} {peak / MEGABYTE:>9.1f}")
+                    if not native:
+                        printed.add(repr(value))
+                    del value
+                ## typed arrays are written out exactly as the lists they replace
+                assert len(printed) <= 1
+            del tokens
+
+
+## Counts the values of a JSONValue tree by type, as a pass-through job does,
+## without reading the value of any number
+def count_types(value):
+    counts = {}
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        counts[value.type] = counts.get(value.type, 0) + 1
+        if value.type == ValueType.DICTIONARY:
+            stack.extend(value.value.values())
+        elif value.type == ValueType.LIST:
+            stack.extend(value.value)
+    return counts
+
+## Adds up every number of a JSONValue tree, reading each one
+def sum_numbers(value):
+    total = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if value.type == ValueType.DICTIONARY:
+            stack.extend(value.value.values())
+        elif value.type == ValueType.LIST:
+            stack.extend(value.value)
+        elif value.type == ValueType.INT or value.type == ValueType.FLOAT:
+            total += float(value.value)
+    return total
+
+def bench_numbers(args):
+    modes = [('float', 'float', False), ('lazy', 'float', True), ('exact', 'exact', False), ('lazy exact', 'exact', True)]
+    print(f"{'input':>16} {'numbers':>10} {'parse s':>8} {'count s':>8} {'sum s':>8} {'peak MB':>8}")
+    for size in args.sizes:
+        documents = [
+            (f'{size}MB synthetic', synthetic_document(int(size * MEGABYTE), args.seed, args.max_text)),
+            (f'{size}MB sensors', sensor_document(int(size * MEGABYTE), args.seed)),
+        ]
+        for name, text in documents:
+            ## the tokens are built first so only the parser's own work is measured
+            tokens = Lexer(record_symbols=False).tokenize(text)
+            counts = set()
+            for label, numbers, lazy_numbers in modes:
+                options = dict(numbers=numbers, lazy_numbers=lazy_numbers)
+                _, peak = peak_memory(lambda: Parser(tokens, **options).parse())
+
+                ## each run parses a fresh tree, so the sum reads lazy numbers for the first time.
+                ## The fastest of a few runs with the garbage collector off is kept
+                best = {}
+                for _ in range(args.repeat):
+                    gc.collect()
+                    gc.disable()
+                    value, parse_seconds = timed(lambda: Parser(tokens, **options).parse())
+                    count, count_seconds = timed(count_types, value)
+                    _, sum_seconds = timed(sum_numbers, value)
+                    gc.enable()
+                    for stage, seconds in [('parse', parse_seconds), ('count', count_seconds), ('sum', sum_seconds)]:
+                        best[stage] = min(seconds, best.get(stage, seconds))
+                    del value
+                counts.add(tuple(sorted(count.items())))
+                print(f"{name:>16} {label:>10} {best['parse']:>8.3f} {best['count']:>8.3f} {best['sum']:>8.3f} {peak / MEGABYTE:>8.1f}")
+            ## every mode finds the same values
+            assert len(counts) == 1
+            del tokens
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0)
+    benchmarks = parser.add_subparsers(dest='benchmark', required=True)
+
+    scanner = benchmarks.add_parser('scanner', help='tokens/sec of the sliced Lexer against the character-by-character path')
+    scanner.add_argument('--sizes', type=float, nargs='+', default=[1, 10, 100])
+    scanner.add_argument('--skip-char', action='store_true', help='only time the current Lexer')
+    scanner.set_defaults(run=bench_scanner)
+
+    pipeline = benchmarks.add_parser('pipeline', help='end-to-end time of parse_text against the ScannerOutput file round trip')
+    pipeline.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    pipeline.add_argument('--repeat', type=int, default=200, help='times to parse the bundled ScannerInputs')
+    pipeline.set_defaults(run=bench_pipeline)
+
+    mapped = benchmarks.add_parser('mapped', help='memory and throughput of memory-mapped byte scanning against reading a str')
+    mapped.add_argument('--sizes', type=float, nargs='+', default=[10, 100])
+    mapped.set_defaults(run=bench_mapped)
+
+    backends = benchmarks.add_parser('backends', help='throughput of each lexer backend')
+    backends.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    backends.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    backends.set_defaults(run=bench_backends)
+
+    tokens = benchmarks.add_parser('tokens', help='memory per token of Token lists against the compact TokenBuffer')
+    tokens.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    tokens.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    tokens.set_defaults(run=bench_tokens)
+
+    native = benchmarks.add_parser('native', help='parse time and peak memory of JSONValue output against native objects')
+    native.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    native.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    native.set_defaults(run=bench_native)
+
+    writer = benchmarks.add_parser('writer', help='time and peak memory of recursive_print against the streaming JSONValue.write')
+    writer.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    writer.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    writer.add_argument('--depth', type=int, default=300, help='nesting depth of the deep input')
+    writer.set_defaults(run=bench_writer)
+
+    engines = benchmarks.add_parser('engines', help='the recursive parser against the iterative engine on wide and deep inputs')
+    engines.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    engines.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    engines.add_argument('--depths', type=int, nargs='+', default=[100, 10000, 100000], help='nesting depths of the deep inputs')
+    engines.set_defaults(run=bench_engines)
+
+    recovery = benchmarks.add_parser('recovery', help='exception-based against lookahead error recovery, and collect mode on invalid input')
+    recovery.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    recovery.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    recovery.set_defaults(run=bench_recovery)
+
+    rules = benchmarks.add_parser('rules', help='the cost of each semantic rule against the trusted profile')
+    rules.add_argument('--sizes', type=float, nargs='+', default=[1])
+    rules.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    rules.add_argument('--width', type=int, default=20000, help='number of keys in the wide dictionary')
+    rules.add_argument('--repeat', type=int, default=5, help='runs of each parse, the fastest is shown')
+    rules.set_defaults(run=bench_rules)
+
+    suite = benchmarks.add_parser('suite', help='per-stage times, tokens/sec and peak memory over sweeps of generated corpora')
+    suite.add_argument('--base-size', type=float, default=1, help='megabytes of input for the depth, width and string length sweeps')
+    suite.add_argument('--depth', type=int, default=2)
+    suite.add_argument('--width', type=int, default=6)
+    suite.add_argument('--string-length', type=int, default=32)
+    suite.add_argument('--sizes', type=float, nargs='+', default=[0.1, 1, 10])
+    suite.add_argument('--depths', type=int, nargs='+', default=[0, 2, 4, 8])
+    suite.add_argument('--widths', type=int, nargs='+', default=[1, 4, 16, 64])
+    suite.add_argument('--string-lengths', type=int, nargs='+', default=[4, 64, 1024])
+    suite.add_argument('--output', help='JSON file to save the results in')
+    suite.set_defaults(run=bench_suite)
+
+    compare = benchmarks.add_parser('compare', help='compare two result files saved by the suite')
+    compare.add_argument('old')
+    compare.add_argument('new')
+    compare.set_defaults(run=bench_compare)
+
+    metrics = benchmarks.add_parser('metrics', help='the cost of the instrumentation when it is disabled and enabled')
+    metrics.add_argument('--sizes', type=float, nargs='+', default=[1])
+    metrics.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    metrics.add_argument('--repeat', type=int, default=5, help='runs of each parse, the fastest is shown')
+    metrics.set_defaults(run=bench_metrics)
+
+    stream = benchmarks.add_parser('stream', help='newline-delimited records: one parser per line against the reused RecordParser and worker pools')
+    stream.add_argument('--counts', type=int, nargs='+', default=[10000, 100000], help='numbers of records')
+    stream.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    stream.add_argument('--chunksize', type=int, default=256, help='lines handed to a worker at a time')
+    stream.set_defaults(run=bench_stream)
+
+    lazy = benchmarks.add_parser('lazy', help='reading two fields of a large document with eager and lazy parsing')
+    lazy.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    lazy.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    lazy.set_defaults(run=bench_lazy)
+
+    query = benchmarks.add_parser('query', help='extracting a few paths against parsing the whole document')
+    query.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    query.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    query.set_defaults(run=bench_query)
+
+    events = benchmarks.add_parser('events', help='aggregating over events against building the tree')
+    events.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    events.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    events.set_defaults(run=bench_events)
+
+    cache = benchmarks.add_parser('cache', help='reruns over a corpus of files with and without the parse cache')
+    cache.add_argument('--files', type=int, default=200)
+    cache.add_argument('--size', type=float, default=20, help='kilobytes per file')
+    cache.set_defaults(run=bench_cache)
+
+    tokenfile = benchmarks.add_parser('tokenfile', help='size, write and load time of the ScannerOutput text format against binary token files')
+    tokenfile.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    tokenfile.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    tokenfile.set_defaults(run=bench_tokenfile)
+
+    incremental = benchmarks.add_parser('incremental', help='latency of single character edits parsed incrementally against parsing from scratch')
+    incremental.add_argument('--sizes', type=float, nargs='+', default=[0.1, 1])
+    incremental.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    incremental.add_argument('--edits', type=int, default=200, help='edits of each kind')
+    incremental.add_argument('--full', type=int, default=3, help='parses from scratch to average')
+    incremental.set_defaults(run=bench_incremental)
+
+    loop_latency = benchmarks.add_parser('async', help='event loop latency while many loopback connections are parsed blocking, in threads and with parse_async')
+    loop_latency.add_argument('--connections', type=int, nargs='+', default=[10, 50])
+    loop_latency.add_argument('--size', type=float, default=100, help='kilobytes per document')
+    loop_latency.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    loop_latency.add_argument('--budgets', type=int, nargs='+', default=[100, 1000, 10000], help='tokens per step of parse_async')
+    loop_latency.add_argument('--interval', type=float, default=1, help='milliseconds between probes of the event loop')
+    loop_latency.set_defaults(run=bench_async)
+
+    typed = benchmarks.add_parser('typed', help='parse time and peak memory of numeric lists built as typed arrays against lists')
+    typed.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    typed.set_defaults(run=bench_typed)
+
+    numbers = benchmarks.add_parser('numbers', help='parse time, pass-through time and read time of eager, lazy and exact numbers')
+    numbers.add_argument('--sizes', type=float, nargs='+', default=[1, 10])
+    numbers.add_argument('--max-text', type=int, default=64, help='longest string value in the synthetic input')
+    numbers.add_argument('--repeat', type=int, default=3, help='runs of each parse, the fastest is shown')
+    numbers.set_defaults(run=bench_numbers)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
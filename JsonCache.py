@@ -0,0 +1,271 @@
+"""A cache of parse results keyed by the content of the input and the parser options.
+
+    cache = ParseCache(capacity=256, directory='.parse-cache')
+    value = cache.parse_file('ScannerInputs/ScannerInput01.txt')
+A result is found by the SHA-256 of the input together with a fingerprint of
+the options: native mode, the engine, the semantic rules that run and the code
+of their checks, typed arrays and the number options. The fingerprint also
+holds a hash of the source of JsonScanner and JsonParser, so editing the
+scanner, the parser or a rule's check gives new keys and the results cached
+before the edit are no longer found. Code outside those two modules, such as
+a rule added from elsewhere that calls other functions, isn't covered.
+
+Results are kept in a bounded in-memory tier that evicts the least recently
+used entry, and, with a directory, in an on-disk tier of pickle files that
+outlives the process. The disk holds values as native objects, which are
+much smaller than pickled JSONValues, and errors as their class and state.
+A typed array is stored as the array, and a lazy number is read before it is
+stored, so a tree read back from disk holds plain numbers.
+A cached error is raised again as a new exception of the same class, so a
+cached parse fails the same way the parse did.
+
+Values from the cache are shared between lookups and must not be changed."""
+import hashlib
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+import JsonParser
+import JsonScanner
+from JsonParser import Parser, JSONValue, ValueType, SEMANTIC_RULES, NATIVE_TYPES, parse_text, is_typed_array
+
+## Bumped whenever the layout of the cached results changes
+CACHE_FORMAT = 1
+
+## The errors the input itself causes, which the same input and options always raise
+## again, so they are cached. Others, such as RecursionError or MemoryError, depend on
+## the environment the parse ran in and are raised without being stored
+INPUT_ERRORS = (
+    JsonScanner.LexerError, JsonScanner.EndOfInputError,
+    JsonParser.TokenStreamError, JsonParser.UnexpectedTokenError, JsonParser.EmptyDictionaryError,
+    JsonParser.EmptyListError, JsonParser.InvalidDecimalError, JsonParser.EmptyKeyError,
+    JsonParser.InvalidNumberError, JsonParser.ReservedWordAsKeyError, JsonParser.DuplicateKeyError,
+    JsonParser.ListTypeError, JsonParser.ReservedWordError, ValueError,
+)
+
+
+## The SHA-256 of the source files of the scanner and parser, which changes with any edit to them
+def source_version():
+    digest = hashlib.sha256()
+    for module in (JsonScanner, JsonParser):
+        with open(module.__file__, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+SOURCE_VERSION = source_version()
+
+## Identifies everything about the parser options and code that can change a result
+def options_fingerprint(native=False, engine='recursive', rules='strict', typed_arrays=False, numbers='float', lazy_numbers=False):
+    ## building a Parser checks the options, resolves a profile name to its rules
+    ## and typed_arrays=True to the kind of array it builds
+    parser = Parser((), native=native, engine=engine, rules=rules, typed_arrays=typed_arrays, numbers=numbers,
+                    lazy_numbers=lazy_numbers)
+    checks = [(name, SEMANTIC_RULES[name].error_type, SEMANTIC_RULES[name].site,
+               SEMANTIC_RULES[name].check.__code__.co_code, SEMANTIC_RULES[name].check.__code__.co_consts)
+              for name in parser.rules]
+    options = (native, engine, checks, parser.typed_arrays, numbers, bool(lazy_numbers))
+    return hashlib.sha256(repr((CACHE_FORMAT, SOURCE_VERSION, options)).encode('utf-8')).hexdigest()
+
+## Converts a JSONValue tree into native objects, without recursion.
+## A typed array is already native and is kept as it is
+def native_of(value):
+    if value.type != ValueType.DICTIONARY and value.type != ValueType.LIST or is_typed_array(value.value):
+        return value.value
+    root = {} if value.type == ValueType.DICTIONARY else []
+    stack = [(value.value, root)]
+    while stack:
+        items, container = stack.pop()
+        is_dict = type(container) is dict
+        for key, item in (items.items() if is_dict else enumerate(items)):
+            if item.type == ValueType.DICTIONARY or item.type == ValueType.LIST and not is_typed_array(item.value):
+                converted = {} if item.type == ValueType.DICTIONARY else []
+                stack.append((item.value, converted))
+            else:
+                converted = item.value
+            if is_dict:
+                container[key] = converted
+            else:
+                container.append(converted)
+    return root
+
+## Converts native objects back into a JSONValue tree, without recursion.
+## A typed array is the value of its list, as the Parser builds it
+def tree_of(value):
+    value_type = NATIVE_TYPES[type(value)]
+    if value_type != ValueType.DICTIONARY and value_type != ValueType.LIST or is_typed_array(value):
+        return JSONValue(value_type, value)
+    root = JSONValue(value_type, {} if value_type == ValueType.DICTIONARY else [])
+    stack = [(value, root.value)]
+    while stack:
+        items, container = stack.pop()
+        is_dict = type(container) is dict
+        for key, item in (items.items() if is_dict else enumerate(items)):
+            item_type = NATIVE_TYPES[type(item)]
+            if item_type == ValueType.DICTIONARY or item_type == ValueType.LIST and not is_typed_array(item):
+                converted = JSONValue(item_type, {} if item_type == ValueType.DICTIONARY else [])
+                stack.append((item, converted.value))
+            else:
+                converted = JSONValue(item_type, item)
+            if is_dict:
+                container[key] = converted
+            else:
+                container.append(converted)
+    return root
+
+
+"""An error captured from a parse. The exception classes of the scanner and
+parser take their own constructor arguments, so they can't be pickled and
+rebuilt the usual way. Instead the class is recorded by name along with the
+exception's args and attributes, and raise_error makes a new exception from
+them without calling its constructor."""
+class CachedError:
+    __slots__ = ('module', 'name', 'args', 'state')
+
+    def __init__(self, error):
+        self.module = type(error).__module__
+        self.name = type(error).__qualname__
+        self.args = error.args
+        self.state = dict(error.__dict__)
+
+    def raise_error(self):
+        error_type = getattr(sys.modules[self.module], self.name)
+        error = error_type.__new__(error_type)
+        error.args = self.args
+        error.__dict__.update(self.state)
+        raise error
+
+    def __getstate__(self):
+        return (self.module, self.name, self.args, self.state)
+
+    def __setstate__(self, state):
+        self.module, self.name, self.args, self.state = state
+
+
+"""Caches the results of parsing JSON text. capacity bounds the number of results
+held in memory, and 0 keeps none there. With a directory, results are also written
+to it and read back by later runs. stats counts how each lookup was answered:
+    hits: found in memory
+    disk_hits: read from the directory
+    misses: parsed
+    evictions: dropped from memory to make room
+    disk_errors: unreadable files in the directory, which are removed and parsed again,
+        and results that couldn't be written there, which are only kept in memory"""
+class ParseCache:
+    def __init__(self, capacity=256, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.fingerprints = {}
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_errors': 0}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    ## The key of some input for the given options. Fingerprints are worked out once per set of options
+    def key(self, content, native, engine, rules, typed_arrays=False, numbers='float', lazy_numbers=False):
+        options = (native, engine, rules if isinstance(rules, str) else tuple(rules), typed_arrays, numbers, lazy_numbers)
+        fingerprint = self.fingerprints.get(options)
+        if fingerprint is None:
+            fingerprint = self.fingerprints[options] = options_fingerprint(*options)
+        return hashlib.sha256(content).hexdigest() + fingerprint[:16]
+
+    ## Parses JSON text as parse_text does, or returns the cached result
+    def parse_text(self, text, native=False, engine='recursive', rules='strict', typed_arrays=False, numbers='float',
+                   lazy_numbers=False):
+        options = dict(native=native, engine=engine, rules=rules, typed_arrays=typed_arrays, numbers=numbers,
+                       lazy_numbers=lazy_numbers)
+        key = self.key(text.encode('utf-8'), **options)
+        return self.lookup(key, native, lambda: parse_text(text, **options))
+
+    ## Parses a file as parse_file does, or returns the cached result.
+    ## The key is the hash of the file's bytes, so the file is only decoded on a miss
+    def parse_file(self, path, native=False, engine='recursive', rules='strict', typed_arrays=False, numbers='float',
+                   lazy_numbers=False):
+        options = dict(native=native, engine=engine, rules=rules, typed_arrays=typed_arrays, numbers=numbers,
+                       lazy_numbers=lazy_numbers)
+        with open(path, 'rb') as file:
+            content = file.read()
+        key = self.key(content, **options)
+        return self.lookup(key, native, lambda: parse_text(str(content, 'utf-8').strip(), **options))
+
+    ## Returns the value for the key, or raises its error, from memory, from disk,
+    ## or by calling parse and storing what it gives
+    def lookup(self, key, native, parse):
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+        else:
+            result = self.read(key, native)
+            if result is not None:
+                self.stats['disk_hits'] += 1
+            else:
+                self.stats['misses'] += 1
+                try:
+                    result = (parse(),)
+                except INPUT_ERRORS as e:
+                    result = CachedError(e)
+                self.write(key, result, native)
+            self.remember(key, result)
+
+        if type(result) is CachedError:
+            result.raise_error()
+        return result[0]
+
+    ## Keeps a result in memory, evicting the least recently used ones past the capacity.
+    ## Values are kept in a one-item tuple, so a cached None is told apart from a miss
+    def remember(self, key, result):
+        if self.capacity <= 0:
+            return
+        self.entries[key] = result
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pickle')
+
+    ## Reads a result from the directory, or returns None if it isn't there
+    def read(self, key, native):
+        if self.directory is None:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                result = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.stats['disk_errors'] += 1
+            os.remove(path)
+            return None
+        if type(result) is CachedError or native:
+            return result
+        return (tree_of(result[0]),)
+
+    ## Writes a result to the directory. The file is written under a temporary
+    ## name and renamed, so other processes never read half a file.
+    ## A result that can't be written, such as a tree too deep to pickle, an error
+    ## holding something unpicklable or a full disk, is only kept in memory
+    def write(self, key, result, native):
+        if self.directory is None:
+            return
+        if type(result) is not CachedError and not native:
+            result = (native_of(result[0]),)
+        path = self.path(key)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporary, 'wb') as file:
+                pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except Exception:
+            self.stats['disk_errors'] += 1
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+    ## Drops every result held in memory. The directory is left as it is
+    def clear(self):
+        self.entries.clear()
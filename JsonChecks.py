@@ -0,0 +1,123 @@
+"""Quick correctness checks, kept apart from the benchmarks so they can be run
+on their own and fail fast. Each check is a subcommand, for example:
+    python JsonChecks.py backends
+A check prints every input it failed on and exits with status 1, or prints
+a summary line when everything agrees. With no subcommand every check runs."""
+import argparse
+import glob
+import random
+
+from JsonScanner import Lexer
+from JsonParser import Parser, RULE_PROFILES
+
+
+## Fragments the randomized backend check builds inputs from: valid tokens,
+## near-misses of keywords and numbers, unterminated strings and non-ASCII text
+FRAGMENTS = ['{', '}', '[', ']', ',', ':', ';', ' ', '\n', '\t', '\xa0', '"', '"abc"', '"é ✓"',
+             'true', 'false', 'null', 'tru', 'truee', 'fals', 'nul', 'nulll', 'nulx',
+             '0', '12', '-3.5', '1e10', '+.', '٣', '²', 'é', 'x', 'e']
+
+## Scans text with a lexer, returning its tokens and symbol table, or the error it raised
+def scan_result(lexer, text):
+    try:
+        tokens = [(token.type, token.value) for token in lexer.tokenize(text)]
+        return tokens, lexer.symbol_table
+    except Exception as e:
+        return type(e), str(e)
+
+## Differential check that every backend gives the same tokens and errors as the DFA backend,
+## on each ScannerInputs file and on randomized inputs. Returns the inputs they disagreed on
+def check_backends(count, seed):
+    texts = []
+    for file_name in sorted(glob.glob('ScannerInputs/*.txt')):
+        with open(file_name, 'r') as file:
+            texts.append(file.read())
+    rng = random.Random(seed)
+    for _ in range(count):
+        texts.append(''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 40))))
+
+    mismatches = []
+    for text in texts:
+        expected = scan_result(Lexer(), text)
+        for backend in Lexer.BACKENDS[1:]:
+            if scan_result(Lexer(backend=backend), text) != expected:
+                mismatches.append((backend, text))
+    return mismatches
+
+def run_backends(args):
+    mismatches = check_backends(args.backends_random, args.seed)
+    for backend, text in mismatches:
+        print(f"{backend} backend disagrees with dfa on {text!r}")
+    if not mismatches:
+        print(f"all backends agree on the ScannerInputs files and {args.backends_random} random inputs")
+    return not mismatches
+
+
+## Fragments the randomized number check builds inputs from: plain, signed and exponent
+## numbers, numbers only some rules accept, lexemes that can't be read, non-ASCII digits and other values
+NUMBER_FRAGMENTS = ['[', ']', '{', '}', ',', ':', '"k"', '"j"', '1', '-2', '0', '3.5', '-0.25', '12345678901234567890123',
+                    '1e2', '1.5e1', '1e30', '2.5e-3', '1e-400', '1e999', '1e99999999999999999999', '-0', '033', '+1',
+                    '1.', '.5', '1-2', '1.2.3', '-', '1e', '²', '١', 'true', 'false', 'null', '"a"']
+
+## Parses text with the options, returning the repr of the value and of every diagnostic
+## in collect mode, or the repr of the error raised
+def parse_result(text, collect, **options):
+    try:
+        if collect:
+            value, diagnostics = Parser(Lexer().tokenize(text), **options).parse_with_diagnostics()
+            return repr(value), [repr(diagnostic) for diagnostic in diagnostics]
+        return repr(Parser(Lexer().tokenize(text), **options).parse())
+    except Exception as e:
+        return repr(e)
+
+## Differential check that lazy numbers give the same values, errors and diagnostics as numbers
+## read as they are parsed, in both number modes and engines, with and without the semantic rules
+## and typed arrays, on randomized inputs. Returns the inputs and options they disagreed on
+def check_numbers(count, seed):
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(count):
+        text = ''.join(rng.choice(NUMBER_FRAGMENTS) for _ in range(rng.randint(1, 24)))
+        for collect in (False, True):
+            for engine in Parser.ENGINES:
+                for numbers in ('float', 'exact'):
+                    for rules in RULE_PROFILES:
+                        for typed_arrays in (False, 'array'):
+                            options = dict(engine=engine, numbers=numbers, rules=rules, typed_arrays=typed_arrays)
+                            if parse_result(text, collect, **options) != parse_result(text, collect, lazy_numbers=True, **options):
+                                mismatches.append((text, dict(options, collect=collect)))
+    return mismatches
+
+def run_numbers(args):
+    mismatches = check_numbers(args.numbers_random, args.seed)
+    for text, options in mismatches:
+        print(f"lazy numbers disagree with eager ones on {text!r} with {options}")
+    if not mismatches:
+        print(f"lazy and eager numbers agree on {args.numbers_random} random inputs")
+    return not mismatches
+
+
+## Every check by name, in the order they run when none is named
+CHECKS = {
+    'backends': run_backends,
+    'numbers': run_numbers,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('checks', nargs='*', help=f"checks to run, from {', '.join(CHECKS)}. All of them by default")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backends-random', type=int, default=20000, help='number of randomized inputs for the backends check')
+    parser.add_argument('--numbers-random', type=int, default=500, help='number of randomized inputs for the numbers check')
+    args = parser.parse_args()
+    for name in args.checks:
+        if name not in CHECKS:
+            parser.error(f"Unknown check '{name}', expected one of {', '.join(CHECKS)}")
+
+    passed = [CHECKS[name](args) for name in args.checks or CHECKS]
+    if not all(passed):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Seeded generator of JSON documents that follow the language this parser accepts.
+
+Every document is valid for both this parser and the json module: containers
+are never empty, every list holds values of one type, keys are unique and
+neither keys nor string values are reserved words. Strings only hold
+letters and spaces, and numbers are written without a leading '+' or zero.
+    python JsonCorpus.py --size 1 --depth 3 --width 8 > document.json"""
+import argparse
+import random
+import string
+import sys
+
+MEGABYTE = 1024 * 1024
+
+## The kinds of scalar values, named after their ValueType
+SCALAR_KINDS = ['STRING', 'INT', 'FLOAT', 'BOOL', 'NULL']
+
+## Characters string values and keys are made of
+STRING_CHARACTERS = string.ascii_letters + '     '
+
+
+"""Generates documents from a seed and the shape of their values:
+    depth: how many levels of containers each record has below it
+    width: how many pairs a dictionary and how many values a list holds
+    string_length: the longest string value
+The same seed and shape always give the same documents."""
+class CorpusGenerator:
+    def __init__(self, seed=0, depth=2, width=6, string_length=32):
+        self.rng = random.Random(seed)
+        self.depth = depth
+        self.width = width
+        self.string_length = string_length
+
+    ## A string value of up to string_length characters that isn't a reserved word
+    def string(self):
+        length = self.rng.randint(1, self.string_length)
+        return ''.join(self.rng.choice(STRING_CHARACTERS) for _ in range(length))
+
+    ## The text of one scalar value of the given kind
+    def scalar(self, kind):
+        if kind == 'STRING':
+            return f'"{self.string()}"'
+        if kind == 'INT':
+            return str(self.rng.randint(-10 ** 6, 10 ** 6))
+        if kind == 'FLOAT':
+            ## always has digits on both sides of the point, and is never a whole number
+            return f'{self.rng.randint(-10 ** 4, 10 ** 4)}.{self.rng.randint(1, 999):03d}'
+        if kind == 'BOOL':
+            return self.rng.choice(['true', 'false'])
+        return 'null'
+
+    ## The text of a dictionary with `width` pairs whose values nest `depth` levels deeper
+    def dictionary(self, depth):
+        pairs = []
+        for index in range(self.width):
+            ## the index keeps every key in the dictionary different
+            key = f'{self.rng.choice(string.ascii_lowercase)}{index}'
+            pairs.append(f'"{key}": {self.value(depth)}')
+        return '{' + ', '.join(pairs) + '}'
+
+    ## The text of a list with `width` values, all of one kind
+    def list(self, depth):
+        kind = self.kind(depth)
+        return '[' + ', '.join(self.value_of_kind(kind, depth) for _ in range(self.width)) + ']'
+
+    ## Picks the kind of a value, containers only while there is depth left
+    def kind(self, depth):
+        if depth > 0 and self.rng.random() < 0.5:
+            return self.rng.choice(['DICTIONARY', 'LIST'])
+        return self.rng.choice(SCALAR_KINDS)
+
+    def value_of_kind(self, kind, depth):
+        if kind == 'DICTIONARY':
+            return self.dictionary(depth - 1)
+        if kind == 'LIST':
+            return self.list(depth - 1)
+        return self.scalar(kind)
+
+    ## The text of any value with up to `depth` levels of containers below it
+    def value(self, depth):
+        return self.value_of_kind(self.kind(depth), depth)
+
+    ## One record: a dictionary nested self.depth levels deep
+    def record(self):
+        return self.dictionary(self.depth)
+
+    ## A list of records that is at least `size` characters long
+    def document(self, size):
+        records = []
+        length = 2
+        while length < size or not records:
+            record = self.record()
+            records.append(record)
+            length += len(record) + 2
+        return '[' + ',\n'.join(records) + ']'
+
+    ## A single value nested `depth` levels deep, one container inside the next
+    def nested(self, depth):
+        text = self.scalar(self.rng.choice(SCALAR_KINDS))
+        for _ in range(depth):
+            if self.rng.random() < 0.5:
+                text = f'[{text}]'
+            else:
+                text = f'{{"{self.rng.choice(string.ascii_lowercase)}": {text}}}'
+        return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=float, default=1, help='megabytes of JSON to write')
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--width', type=int, default=6)
+    parser.add_argument('--string-length', type=int, default=32)
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(args.seed, args.depth, args.width, args.string_length)
+    sys.stdout.write(generator.document(int(args.size * MEGABYTE)))
+
+
+if __name__ == "__main__":
+    main()
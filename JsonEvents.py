@@ -0,0 +1,198 @@
+"""Event-driven parsing: the parser reports what it reads instead of building a tree.
+
+An EventParser runs the grammar and error recovery of the iterative engine and
+calls a handler for each event:
+    start_object(), key(key), end_object(), start_array(), end_array(),
+    scalar(type, value) and discard(count)
+A handler that adds up one field sees every value go past without the tree
+ever being held:
+    class Total(EventHandler):
+        ...
+    parse_events(text, Total())
+TreeHandler rebuilds the JSONValue tree, or the native objects, from the events.
+
+discard(count) is only sent during error recovery: it means the innermost
+count containers that were started have been abandoned and won't be ended,
+as the Parser drops a list item or a pair's value it can't finish."""
+from operator import attrgetter
+
+from JsonScanner import Lexer
+from JsonParser import Parser, JSONValue, ValueType, native_value
+
+
+"""The interface of an event handler. Every method does nothing, so a handler
+only defines the events it needs. result() is what EventParser.parse returns."""
+class EventHandler:
+    def start_object(self):
+        pass
+
+    def key(self, key):
+        pass
+
+    def end_object(self):
+        pass
+
+    def start_array(self):
+        pass
+
+    def end_array(self):
+        pass
+
+    ## type is a ValueType, and value is the str, int, float, bool or None
+    def scalar(self, type, value):
+        pass
+
+    def discard(self, count):
+        pass
+
+    def result(self):
+        return None
+
+
+"""Rebuilds the parsed value from the events: the same JSONValue tree as
+Parser.parse, or native Python objects with native=True.
+The stack holds one frame per open container: [container, key of the current pair]."""
+class TreeHandler(EventHandler):
+    def __init__(self, native=False):
+        self.build = native_value if native else JSONValue
+        self.stack = []
+        self.value = None
+
+    def start_object(self):
+        self.stack.append([{}, None])
+
+    def key(self, key):
+        self.stack[-1][1] = key
+
+    def end_object(self):
+        self.add(self.build(ValueType.DICTIONARY, self.stack.pop()[0]))
+
+    def start_array(self):
+        self.stack.append([[], None])
+
+    def end_array(self):
+        self.add(self.build(ValueType.LIST, self.stack.pop()[0]))
+
+    def scalar(self, type, value):
+        self.add(self.build(type, value))
+
+    def discard(self, count):
+        del self.stack[len(self.stack) - count:]
+
+    ## puts a finished value in the container around it, or keeps it as the result
+    def add(self, value):
+        if not self.stack:
+            self.value = value
+            return
+        container, key = self.stack[-1]
+        if type(container) is dict:
+            container[key] = value
+        else:
+            container.append(value)
+
+    def result(self):
+        return self.value
+
+
+"""Stands in for a dictionary in the iterative engine's frames. It only keeps
+the number of pairs, and their keys when the duplicate key rule needs them."""
+class EventDict:
+    __slots__ = ('count', 'keys')
+
+    def __init__(self, keep_keys):
+        self.count = 0
+        self.keys = set() if keep_keys else None
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __setitem__(self, key, value):
+        self.count += 1
+        if self.keys is not None:
+            self.keys.add(key)
+
+
+"""Stands in for a list in the iterative engine's frames. It only keeps the
+number of items and the first one, which the list type rule compares with."""
+class EventList:
+    __slots__ = ('count', 'first')
+
+    def __init__(self):
+        self.count = 0
+        self.first = None
+
+    def __len__(self):
+        return self.count
+
+    ## only the first item can be read back
+    def __getitem__(self, index):
+        return self.first
+
+    def append(self, value):
+        if self.count == 0:
+            self.first = value
+        self.count += 1
+
+
+"""A Parser that sends events to a handler instead of building a tree. It always
+runs the iterative engine, with its semantic rules and error recovery, and
+collect mode works as it does for the Parser. Containers are never held:
+the engine's frames get an EventDict or EventList, and every value the
+engine builds is a JSONValue whose container value is None.
+A ListTypeError for a list or dictionary item therefore shows None
+where the Parser shows the item."""
+class EventParser(Parser):
+    def __init__(self, input, handler, rules='strict', metrics=None) -> None:
+        self.handler = handler
+        super().__init__(input, engine='iterative', rules=rules, metrics=metrics)
+        self.build = self.build_event
+        self.type_of = attrgetter('type')
+        self.value_of = attrgetter('value')
+        self.new_dict = self.start_object
+        self.new_list = self.start_array
+        self.keep_keys = 'duplicate_key' in self.rules
+
+    ## The key site runs for every dictionary key as soon as it is read,
+    ## before its value, so the key event is sent from there
+    def set_rules(self, rules):
+        super().set_rules(rules)
+        self.key_checks = self.key_checks + (send_key,)
+
+    def start_object(self):
+        self.handler.start_object()
+        return EventDict(self.keep_keys)
+
+    def start_array(self):
+        self.handler.start_array()
+        return EventList()
+
+    ## the engine builds a container once it is closed, and a scalar once it is read
+    def build_event(self, type, value):
+        if type == ValueType.DICTIONARY:
+            self.handler.end_object()
+            return JSONValue(type, None)
+        if type == ValueType.LIST:
+            self.handler.end_array()
+            return JSONValue(type, None)
+        self.handler.scalar(type, value)
+        return JSONValue(type, value)
+
+    def discard(self, count):
+        self.handler.discard(count)
+
+    ## parses the document, sending its events, and returns the handler's result
+    def parse(self):
+        super().parse()
+        return self.handler.result()
+
+## Sends the event for a key that has just been read
+def send_key(parser, token):
+    parser.handler.key(token.value)
+
+## Parses JSON text, sending the events to the handler as the Lexer's tokens are scanned.
+## Returns the handler's result. Other keyword options go to the EventParser
+def parse_events(text, handler, **options):
+    return EventParser(Lexer(record_symbols=False).iter_tokens(text), handler, **options).parse()
@@ -0,0 +1,346 @@
+"""Incremental parsing of a document that is edited a few characters at a time.
+
+An IncrementalDocument keeps the tokens of its text along with where each one
+starts and ends, and the span of tokens every list and dictionary covers:
+    document = IncrementalDocument(text)
+    document.edit(120, 1, '7')
+    document.value
+An edit scans the text again from the first token it can change, only until a
+token starts where a token after the edit used to start; from there on the
+tokens are the same as before. The smallest list or dictionary holding every
+changed token is then parsed again, with its semantic rules, and its items are
+replaced in the existing container. The containers around it are left as they
+are, so the root value and every container that wasn't changed keep their
+identity. An edit that only changes whitespace doesn't parse anything.
+
+An edit that changes the brackets of the containers around it, or a document
+that is a single scalar, is parsed again in full. Errors are raised as the
+Parser raises them. After an error the document is parsed in full on each edit
+until it is valid again.
+
+Tokens are kept in lists with a gap at the last edit: the offsets of the tokens
+before the gap are counted from the start of the text, and those after it from
+the end, so an edit doesn't have to shift the offsets of every later token.
+Moving the gap to the next edit only converts the tokens in between."""
+from array import array
+from bisect import bisect_left
+
+from JsonScanner import Lexer, TokenType, LexerError, EndOfInputError
+from JsonParser import Parser, UnexpectedTokenError
+
+## The closing bracket of each opening bracket, and the other way round
+OPENING_TYPES = {TokenType.LBRACE: TokenType.RBRACE, TokenType.LBRACKET: TokenType.RBRACKET}
+CLOSING_TYPES = {closing: opening for opening, closing in OPENING_TYPES.items()}
+
+
+"""The tokens of one list or dictionary. container is the dict or list
+of its items in the parsed value, which edits change in place. start is
+the index of its opening bracket and width the number of tokens to its
+closing bracket. An opening bracket after the gap has a negative start,
+counted back from the end of the token list, and its width only changes
+when an edit inside it changes the number of tokens."""
+class Span:
+    __slots__ = ('container', 'parent', 'start', 'width')
+
+    def __init__(self, parent, start):
+        self.container = None
+        self.parent = parent
+        self.start = start
+        self.width = 0
+
+
+"""A Parser that records the dict or list of every container it parses,
+by the index of the container's closing bracket. first is the index of
+the first token of the input in the whole document, so the indexes
+and the token numbers in errors are those of the document."""
+class SpanParser(Parser):
+    def __init__(self, tokens, first=0, **options) -> None:
+        super().__init__(tokens, **options)
+        self.tokenizer.current_index = first - 1
+        self.closed = {}
+
+    def parse_dict(self):
+        dictionary = super().parse_dict()
+        self.closed[self.tokenizer.current_index - 1] = dictionary
+        return dictionary
+
+    def parse_list(self):
+        list = super().parse_list()
+        self.closed[self.tokenizer.current_index - 1] = list
+        return list
+
+    ## a typed array is recorded as it is, since it is replaced whole rather than in place
+    def parse_typed_list(self):
+        value = super().parse_typed_list()
+        if value is not None:
+            self.closed[self.tokenizer.current_index - 1] = self.value_of(value)
+        return value
+
+    ## the iterative engine builds each container once its closing bracket is eaten
+    def close_container(self, frame):
+        self.closed[self.tokenizer.current_index - 1] = frame[1]
+        return super().close_container(frame)
+
+    ## Parses one value, returning whether it ended just before the EOF token
+    def parse_region(self):
+        self.next_token()
+        if self.engine == 'iterative':
+            self.parse_iterative()
+        else:
+            self.parse_value()
+        return self.current_token.type == TokenType.EOF
+
+
+## Whether the items of the new container can be put in place of the old one's:
+## both are dicts or lists, typed arrays with the same typecode,
+## or NumPy arrays of the same dtype and length, which can't be resized
+def replaceable(old, new):
+    if type(old) is not type(new):
+        return False
+    if type(old) is array:
+        return old.typecode == new.typecode
+    if type(old) is dict or type(old) is list:
+        return True
+    return old.dtype == new.dtype and old.shape == new.shape
+
+
+"""A JSON document that is parsed again incrementally as it is edited.
+Options are those of the Parser, except metrics, and backend chooses the
+Lexer backend. stats counts the work done:
+    edits: edits made
+    tokens_scanned: tokens scanned again after edits
+    tokens_parsed: tokens parsed again after edits
+    full_parses: times the whole document was parsed, the first time included"""
+class IncrementalDocument:
+    def __init__(self, text, backend='dfa', **options) -> None:
+        self.lexer = Lexer(record_symbols=False, backend=backend)
+        self.options = options
+        self.stats = {'edits': 0, 'tokens_scanned': 0, 'tokens_parsed': 0, 'full_parses': 0}
+        self.load(text)
+
+    ## Scans and parses the whole text
+    def load(self, text):
+        self.text = text
+        self.value = None
+        self.indexed = False
+        self.tokens = []
+        self.starts = array('q')
+        self.ends = array('q')
+        self.owners = []
+        self.gap = 0
+
+        lexer = self.lexer
+        tokens = []
+        starts = array('q')
+        ends = array('q')
+        for token in lexer.iter_tokens(text):
+            tokens.append(token)
+            starts.append(lexer.token_start)
+            ends.append(lexer.position)
+        self.tokens = tokens
+        self.starts = starts
+        self.ends = ends
+        self.owners = [None] * len(tokens)
+        self.gap = len(tokens)
+        return self.parse_all()
+
+    ## Parses every token again and indexes every container. If the containers
+    ## the parser built don't line up with the brackets, the value is still kept,
+    ## but later edits parse the whole document
+    def parse_all(self):
+        self.stats['full_parses'] += 1
+        self.owners = [None] * len(self.tokens)
+        self.move_gap(len(self.tokens))
+        self.value = None
+        self.indexed = False
+
+        parser = SpanParser(self.tokens, **self.options)
+        self.value = parser.parse()
+        spans = self.index_brackets(0, len(self.tokens) - 1, [])
+        self.indexed = spans is not None and self.fill_spans(spans, parser.closed)
+        return self.value
+
+    ## Makes the offsets of the tokens before index count from the start of the
+    ## text, and those from index on count from the end, moving the gap there
+    def move_gap(self, index):
+        if index > self.gap:
+            low, high, shift, token_shift = self.gap, index, len(self.text), len(self.tokens)
+        else:
+            low, high, shift, token_shift = index, self.gap, -len(self.text), -len(self.tokens)
+        self.starts[low:high] = array('q', [start + shift for start in self.starts[low:high]])
+        self.ends[low:high] = array('q', [end + shift for end in self.ends[low:high]])
+        for token, span in zip(self.tokens[low:high], self.owners[low:high]):
+            if span is not None and token.type in OPENING_TYPES:
+                span.start += token_shift
+        self.gap = index
+
+    ## the offset in the text where the token at index starts
+    def start_of(self, index):
+        if index < self.gap:
+            return self.starts[index]
+        return self.starts[index] + len(self.text)
+
+    ## the index of the first token that ends at or after the offset
+    def token_ending_after(self, offset):
+        gap = self.gap
+        if gap > 0 and self.ends[gap - 1] >= offset:
+            return bisect_left(self.ends, offset, 0, gap)
+        return bisect_left(self.ends, offset - len(self.text), gap, len(self.tokens))
+
+    ## the index of the span's opening bracket
+    def opener(self, span):
+        return span.start if span.start >= 0 else span.start + len(self.tokens)
+
+    ## Gives a Span to the tokens from first to last, which must be before the gap.
+    ## stack holds the spans that are open at first. Returns the new spans, or None
+    ## if a closing bracket doesn't match or a bracket is left open
+    def index_brackets(self, first, last, stack):
+        tokens = self.tokens
+        owners = self.owners
+        spans = []
+        for index in range(first, last + 1):
+            token_type = tokens[index].type
+            if token_type in OPENING_TYPES:
+                span = Span(stack[-1] if stack else None, index)
+                spans.append(span)
+                stack.append(span)
+                owners[index] = span
+            elif token_type in CLOSING_TYPES:
+                if not stack or tokens[stack[-1].start].type != CLOSING_TYPES[token_type]:
+                    return None
+                span = stack.pop()
+                span.width = index - span.start
+                owners[index] = span
+            else:
+                owners[index] = stack[-1] if stack else None
+        if stack:
+            return None
+        return spans
+
+    ## Gives each span the container the parser built for it.
+    ## Returns False if the parser built no container for one of them
+    def fill_spans(self, spans, closed):
+        for span in spans:
+            span.container = closed.get(span.start + span.width)
+            if span.container is None:
+                return False
+        return True
+
+    ## Replaces the `deleted` characters at offset with the inserted text,
+    ## then scans and parses what changed. Returns the value of the document
+    def edit(self, offset, deleted, inserted):
+        text = self.text
+        if offset < 0 or deleted < 0 or offset + deleted > len(text):
+            raise ValueError(f"The edit of {deleted} characters at {offset} is outside the text of length {len(text)}")
+        new_text = text[:offset] + inserted + text[offset + deleted:]
+        self.stats['edits'] += 1
+        if not self.indexed:
+            return self.load(new_text)
+
+        ## Scan from the first token the edit can change, which includes a token just
+        ## before the edit that it might extend, until a token starts where an old token
+        ## after the edit started. The tokens from first up to last are replaced
+        change = len(inserted) - deleted
+        first = self.token_ending_after(offset)
+        last = first
+        token_count = len(self.tokens)
+        new_tokens = []
+        new_starts = array('q')
+        new_ends = array('q')
+        lexer = self.lexer
+        try:
+            for token in lexer.iter_tokens(new_text, min(self.start_of(first), offset)):
+                start = lexer.token_start
+                if start >= offset + len(inserted):
+                    old_start = start - change
+                    while last < token_count and self.start_of(last) < old_start:
+                        last += 1
+                    if old_start >= offset + deleted and self.start_of(last) == old_start:
+                        break
+                new_tokens.append(token)
+                new_starts.append(start)
+                new_ends.append(lexer.position)
+        except (LexerError, EndOfInputError):
+            self.load_failed(new_text)
+            raise
+        self.stats['tokens_scanned'] += len(new_tokens) + 1
+
+        ## only whitespace changed, so only the offsets need to be updated
+        if [(token.type, token.value) for token in new_tokens] == [(token.type, token.value) for token in self.tokens[first:last]]:
+            self.move_gap(last)
+            self.starts[first:last] = new_starts
+            self.ends[first:last] = new_ends
+            self.text = new_text
+            return self.value
+
+        ## the smallest container around the changed tokens whose brackets are left as they were
+        span = None
+        if first > 0:
+            span = self.owners[first - 1]
+            if self.tokens[first - 1].type in CLOSING_TYPES:
+                span = span.parent
+        while span is not None and self.opener(span) + span.width < last:
+            span = span.parent
+
+        self.move_gap(last)
+        self.tokens[first:last] = new_tokens
+        self.starts[first:last] = new_starts
+        self.ends[first:last] = new_ends
+        self.owners[first:last] = [None] * len(new_tokens)
+        self.gap = first + len(new_tokens)
+        self.text = new_text
+        if span is None:
+            return self.reparse_all()
+        return self.reparse(span, len(new_tokens) - (last - first))
+
+    ## Parses the span again after an edit inside it changed the number of its tokens by change
+    def reparse(self, span, change):
+        ancestor = span
+        while ancestor is not None:
+            ancestor.width += change
+            ancestor = ancestor.parent
+        start = self.opener(span)
+        end = start + span.width
+        self.move_gap(end + 1)
+
+        spans = self.index_brackets(start + 1, end, [span])
+        if spans is None or start + span.width != end:
+            return self.reparse_all()
+        parser = SpanParser(self.tokens[start:end + 1] + self.tokens[-1:], start, **self.options)
+        try:
+            complete = parser.parse_region()
+        ## a syntax error might be recovered from by a container around this one,
+        ## so what it does is left to a parse of the whole document
+        except UnexpectedTokenError:
+            return self.reparse_all()
+        except Exception:
+            self.value = None
+            self.indexed = False
+            raise
+        self.stats['tokens_parsed'] += end + 1 - start
+        container = parser.closed.get(end)
+        if not complete or container is None or not self.fill_spans(spans, parser.closed):
+            return self.reparse_all()
+
+        ## the items are replaced in place, so the values holding this container stay as they are.
+        ## A list that becomes a typed array, or the other way round, can't be, so the whole
+        ## document is parsed again
+        if not replaceable(span.container, container):
+            return self.reparse_all()
+        if type(container) is dict:
+            span.container.clear()
+            span.container.update(container)
+        else:
+            span.container[:] = container
+        return self.value
+
+    ## Parses the whole document again after an edit, from the tokens already scanned
+    def reparse_all(self):
+        self.stats['tokens_parsed'] += len(self.tokens)
+        return self.parse_all()
+
+    ## Keeps the edited text after it failed to scan, so the next edit scans all of it again
+    def load_failed(self, text):
+        self.text = text
+        self.value = None
+        self.indexed = False
@@ -0,0 +1,201 @@
+"""Lazy parsing: lists and dictionaries are only parsed when their value is read.
+
+A first pass over the token types builds a StructuralIndex, which finds the
+closing bracket of every container. Parsing then stops at the outermost
+container: its value is read on demand, and each list or dictionary inside it
+is again a LazyJSONValue that is parsed when it is reached. The semantic rules
+run for each container as it is parsed:
+    document = parse_lazy_text(text)
+    document.value['name'].value
+Only a document whose brackets all match is parsed lazily. For anything else,
+and for a document that is a single scalar, the ordinary Parser is used and
+its errors are raised straight away. An error inside a lazy container is
+raised when that container is read, and load() reads every container to
+find them all up front."""
+import re
+from array import array
+from bisect import bisect_left
+
+from JsonScanner import Lexer, TokenType, TOKEN_CODES
+from JsonParser import Parser, JSONValue, ValueType
+
+## The codes of the opening and closing brackets and of the separators
+OPENING_CODES = {TOKEN_CODES[TokenType.LBRACE]: TOKEN_CODES[TokenType.RBRACE],
+                 TOKEN_CODES[TokenType.LBRACKET]: TOKEN_CODES[TokenType.RBRACKET]}
+CLOSING_CODES = frozenset(OPENING_CODES.values())
+SEPARATOR_CODES = bytes([TOKEN_CODES[TokenType.COMMA], TOKEN_CODES[TokenType.COLON]])
+## Find the brackets and the separators in the bytes of the token type codes
+BRACKET_PATTERN = re.compile(b'[' + re.escape(bytes(sorted(OPENING_CODES) + sorted(CLOSING_CODES))) + b']')
+SEPARATOR_PATTERN = re.compile(b'[' + re.escape(SEPARATOR_CODES) + b']')
+EOF_CODE = TOKEN_CODES[TokenType.EOF]
+
+
+class UnbalancedBracketError(Exception):
+    def __init__(self, token_index) -> None:
+        self.token_index = token_index
+        super().__init__(f"The bracket at token {token_index} has no matching bracket")
+
+
+## The token type codes of a TokenBuffer or a list of Tokens, as bytes
+def token_codes(tokens):
+    if hasattr(tokens, 'types'):
+        return tokens.types.tobytes()
+    return bytes(TOKEN_CODES[token.type] for token in tokens)
+
+
+"""The positions of the braces, brackets, colons and commas of a token stream.
+brackets holds the token index of every brace and bracket in order, and
+partners holds the token index of the bracket matching each of them. They are
+arrays of 8 byte integers, so the index is compact next to the tree it stands
+in for. Colons and commas outnumber the brackets and lazy parsing doesn't need
+them, so they are found in the token codes when they are asked for.
+Building the index raises UnbalancedBracketError if a bracket isn't matched
+by one of its own kind."""
+class StructuralIndex:
+    def __init__(self, codes) -> None:
+        self.codes = codes
+        self.brackets = array('q')
+        self.brackets.extend(match.start() for match in BRACKET_PATTERN.finditer(codes))
+        self.partners = array('q', [-1]) * len(self.brackets)
+
+        ## each entry of the stack is the slot of an opening bracket that isn't closed yet
+        stack = []
+        brackets = self.brackets
+        partners = self.partners
+        for slot, position in enumerate(brackets):
+            code = codes[position]
+            if code in OPENING_CODES:
+                stack.append(slot)
+            elif not stack or OPENING_CODES[codes[brackets[stack[-1]]]] != code:
+                raise UnbalancedBracketError(position)
+            else:
+                opening = stack.pop()
+                partners[opening] = position
+                partners[slot] = brackets[opening]
+        if stack:
+            raise UnbalancedBracketError(brackets[stack[-1]])
+
+    ## the token index of the bracket matching the one at token_index
+    def partner(self, token_index):
+        return self.partners[bisect_left(self.brackets, token_index)]
+
+    ## the token indexes of the colons and commas between two token indexes
+    def separators_between(self, start, end):
+        return array('q', [match.start() for match in SEPARATOR_PATTERN.finditer(self.codes, start, end)])
+
+    ## bytes used by the arrays, not counting the token codes
+    def nbytes(self):
+        return sum(len(column) * column.itemsize for column in (self.brackets, self.partners))
+
+
+"""Gives the Parser the same interface as the Tokenizer over a token list
+or TokenBuffer, starting at any token and able to jump ahead.
+current_index is the index of the parser's current token, as with the Tokenizer."""
+class IndexedTokens:
+    def __init__(self, tokens, start) -> None:
+        self.tokens = tokens
+        self.current_index = start - 1
+
+    def next_token(self):
+        self.current_index += 1
+        return self.tokens[self.current_index]
+
+    ## the next call to next_token returns the token at index
+    def seek(self, index):
+        self.current_index = index - 1
+
+
+"""A list or dictionary that is parsed the first time its value is read.
+It keeps the document it came from and the index of its opening bracket
+until then. Its type is known without parsing it, so the list type rule
+can compare it with its neighbours while it is still unread."""
+class LazyJSONValue(JSONValue):
+    __slots__ = ('document', 'start', 'loaded')
+
+    def __init__(self, type, document, start):
+        self.type = type
+        self.document = document
+        self.start = start
+        self.loaded = None
+
+    @property
+    def value(self):
+        if self.loaded is None:
+            self.loaded = self.document.parse_container(self.type, self.start)
+        return self.loaded
+
+    @value.setter
+    def value(self, value):
+        self.loaded = value
+
+    ## whether the value has been parsed yet
+    def is_loaded(self):
+        return self.loaded is not None
+
+    ## Parses every container below this one, raising the first error found.
+    ## The containers are kept on a stack, so deep documents don't reach the recursion limit
+    def load(self):
+        stack = [self]
+        while stack:
+            value = stack.pop()
+            items = value.value.values() if value.type == ValueType.DICTIONARY else value.value
+            stack.extend(item for item in items if isinstance(item, LazyJSONValue))
+        return self
+
+
+"""The parser behind a lazily parsed document. Parsing a container reads its
+scalars with the ordinary Parser methods, so they go through the same
+semantic rules, but each container inside it becomes a LazyJSONValue and
+the parser jumps straight to the token after its closing bracket."""
+class LazyParser(Parser):
+    ## the options are those of the Parser, except that values are
+    ## always JSONValues and errors are always raised
+    def __init__(self, tokens, index, **options) -> None:
+        if options.get('native'):
+            raise ValueError("Lazy parsing builds JSONValues, native=True isn't supported")
+        super().__init__((), **options)
+        self.tokens = tokens
+        self.index = index
+
+    def parse_value(self):
+        token_type = self.current_token.type
+        if token_type == TokenType.LBRACE or token_type == TokenType.LBRACKET:
+            start = self.tokenizer.current_index
+            self.tokenizer.seek(self.index.partner(start) + 1)
+            self.next_token()
+            value_type = ValueType.DICTIONARY if token_type == TokenType.LBRACE else ValueType.LIST
+            return LazyJSONValue(value_type, self, start)
+        return self.parse_scalar()
+
+    ## Parses the list or dictionary whose opening bracket is at token index start.
+    ## Returns the dict or list of its values
+    def parse_container(self, value_type, start):
+        self.tokenizer = IndexedTokens(self.tokens, start)
+        self.next_token()
+        if value_type == ValueType.DICTIONARY:
+            return self.parse_dict()
+        return self.parse_list()
+
+
+## Parses a token list or TokenBuffer, returning a LazyJSONValue for a document that is
+## a list or dictionary. Falls back to the ordinary Parser for a scalar document, or
+## when the brackets don't match or something follows the outermost container,
+## so those errors are the Parser's. Other keyword options go to the Parser
+def parse_lazy(tokens, **options):
+    codes = token_codes(tokens)
+    if not codes or codes[0] not in OPENING_CODES:
+        return Parser(iter(tokens), **options).parse()
+    try:
+        index = StructuralIndex(codes)
+    except UnbalancedBracketError:
+        return Parser(iter(tokens), **options).parse()
+    end = index.partner(0)
+    if end + 1 >= len(codes) or codes[end + 1] != EOF_CODE:
+        return Parser(iter(tokens), **options).parse()
+
+    value_type = ValueType.DICTIONARY if codes[0] == TOKEN_CODES[TokenType.LBRACE] else ValueType.LIST
+    return LazyJSONValue(value_type, LazyParser(tokens, index, **options), 0)
+
+## Scans JSON text into a compact TokenBuffer and parses it lazily
+def parse_lazy_text(text, **options):
+    return parse_lazy(Lexer(record_symbols=False).tokenize_compact(text), **options)
@@ -0,0 +1,149 @@
+"""Opt-in instrumentation for the scanner and parser.
+
+A Metrics object is passed to the Parser (or parse_text/parse_file) as metrics=...
+and collects stage timers, token counts, nesting depth, recovered errors and
+semantic rule counts across every document parsed with it:
+    metrics = Metrics(trace_memory=True, callback=print)
+    parse_text(text, metrics=metrics)
+    metrics.snapshot()
+Without a Metrics object none of this code runs."""
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from JsonScanner import TokenType
+
+
+"""Collects timings and counts from every Parser it is passed to.
+The counters are plain dicts keyed by stage, TokenType, recovery kind or rule name."""
+class Metrics:
+    ## trace_memory samples the tracemalloc peak of every timed stage.
+    ## callback, if given, is called with a snapshot after every parsed document
+    def __init__(self, trace_memory=False, callback=None):
+        self.trace_memory = trace_memory
+        self.callbacks = []
+        if callback is not None:
+            self.callbacks.append(callback)
+        self.reset()
+
+    ## Clears every timer and counter
+    def reset(self):
+        ## seconds spent in each stage
+        self.seconds = {}
+        ## number of tokens of each TokenType
+        self.tokens = {}
+        self.max_depth = 0
+        ## number of errors the parser recovered from, by kind
+        self.recovered = {}
+        ## times each semantic rule ran, and times it found an error
+        self.rule_checks = {}
+        self.rule_hits = {}
+        self.diagnostics = 0
+        self.documents = 0
+        self.failed_documents = 0
+        self.peak_memory = 0
+
+    ## Adds another function to be called with each snapshot
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    ## Times the code run inside the with block under the stage's name.
+    ## Time added to the exclude stage while the block runs, such as the time spent
+    ## producing tokens while the parser pulls them, is left out of this stage.
+    ## With trace_memory the tracemalloc peak of the block is sampled too
+    @contextmanager
+    def stage(self, name, exclude=None):
+        started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        excluded = self.seconds.get(exclude, 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start - (self.seconds.get(exclude, 0.0) - excluded)
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+            if self.trace_memory:
+                self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+                if started_tracing:
+                    tracemalloc.stop()
+
+    ## Passes the tokens through, counting them by type and following the nesting depth.
+    ## The time taken to produce each token is added to the 'tokens' stage as it is
+    ## read, which is the scanning time when the tokens come from a Lexer
+    def count_tokens(self, tokens):
+        counts = self.tokens
+        seconds = self.seconds
+        seconds.setdefault('tokens', 0.0)
+        depth = 0
+        iterator = iter(tokens)
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            token = next(iterator, None)
+            seconds['tokens'] += clock() - start
+            if token is None:
+                return
+            counts[token.type] = counts.get(token.type, 0) + 1
+            if token.type == TokenType.LBRACE or token.type == TokenType.LBRACKET:
+                depth += 1
+                if depth > self.max_depth:
+                    self.max_depth = depth
+            elif (token.type == TokenType.RBRACE or token.type == TokenType.RBRACKET) and depth > 0:
+                depth -= 1
+            yield token
+
+    ## Counts a list of tokens that has already been read, such as the Tokenizer's
+    def count_token_list(self, tokens):
+        for _ in self.count_tokens(tokens):
+            pass
+
+    def count_recovery(self, kind):
+        self.recovered[kind] = self.recovered.get(kind, 0) + 1
+
+    def count_diagnostic(self):
+        self.diagnostics += 1
+
+    ## Wraps a SemanticRule's check so every run and every error it finds is counted
+    def counted_check(self, rule):
+        self.rule_checks.setdefault(rule.name, 0)
+        self.rule_hits.setdefault(rule.name, 0)
+        check = rule.check
+
+        def counted(parser, *args):
+            self.rule_checks[rule.name] += 1
+            reported = len(parser.diagnostics)
+            try:
+                check(parser, *args)
+            except Exception:
+                self.rule_hits[rule.name] += 1
+                raise
+            if len(parser.diagnostics) != reported:
+                self.rule_hits[rule.name] += 1
+        return counted
+
+    ## Called by the Parser after each document, successful or not
+    def document_parsed(self, failed=False):
+        self.documents += 1
+        if failed:
+            self.failed_documents += 1
+        if self.callbacks:
+            snapshot = self.snapshot()
+            for callback in self.callbacks:
+                callback(snapshot)
+
+    ## Every timer and counter as plain values, ready to be exported
+    def snapshot(self):
+        return {
+            'documents': self.documents,
+            'failed_documents': self.failed_documents,
+            'seconds': dict(self.seconds),
+            'tokens': dict(self.tokens),
+            'max_depth': self.max_depth,
+            'recovered': dict(self.recovered),
+            'rule_checks': dict(self.rule_checks),
+            'rule_hits': dict(self.rule_hits),
+            'diagnostics': self.diagnostics,
+            'peak_memory': self.peak_memory if self.trace_memory else None,
+        }
@@ -1,7 +1,18 @@
 from JsonScanner import Token, TokenType
+from operator import attrgetter
+from array import array
+from decimal import Decimal, InvalidOperation
+import io
 import os
+import re
 import JsonScanner
 
+## NumPy is optional, and only used for typed_arrays='numpy'
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 ## Error that gets raised when there was an issue with scanning the tokens 
 ## from the token input
 ## Error outputs the line that it attempted to read and the location of it.
@@ -85,6 +96,9 @@ class ValueType:
     BOOL = "BOOL"
     NULL = "NULL"
     
+## marks the end of a container's items in JSONValue.write
+END = object()
+
 """This is a wrapper class for all types of JSON values
 JSON values can be store inside other JSON values.
 for example a JSONValue list stores JSONValues
@@ -92,13 +106,88 @@ Since every value is stored in this JSONValue wrapper, I am able to
 create a recursive printing function to output the tree representation
 for any type of json value."""
 class JSONValue:
+    __slots__ = ('value', 'type')
+
     def __init__(self, type, value):
         ## any type of value can be stored
         self.value = value
         self.type = type
     ## returns the tree representation of this value as a string
     def __repr__(self) -> str:
-        return self.recursive_print(0)
+        output = io.StringIO()
+        self.write(output)
+        return output.getvalue()
+    
+    """Writes the same tree representation as recursive_print to a text file object.
+    Instead of recursing, the containers being written are kept on a stack,
+    so deep documents don't reach the recursion limit. The output is collected
+    in pieces and written to the file every chunk_size pieces, so the whole
+    representation is never held in memory at once.
+    With a JsonMetrics.Metrics as metrics, the time taken is its 'print' stage."""
+    def write(self, file, chunk_size=4096, metrics=None):
+        if metrics is not None:
+            with metrics.stage('print'):
+                return self.write(file, chunk_size)
+        chunks = []
+        ## each stack entry is a container being written: its remaining items,
+        ## its indent, and whether it is a dictionary
+        stack = []
+        value, depth = self, 0
+        
+        while True:
+            ## write the next value: a scalar is finished straight away,
+            ## a list or dict is opened and pushed onto the stack
+            if value.type == ValueType.DICTIONARY:
+                chunks.append('{\n')
+                stack.append((iter(value.value.items()), " " * depth, True))
+            elif value.type == ValueType.LIST:
+                chunks.append('[\n')
+                stack.append((iter(list_items(value.value)), " " * depth, False))
+            else:
+                chunks.append(value.scalar_text())
+                if not stack:
+                    break
+                chunks.append('\n')
+            
+            ## close every container that has no items left, then move to the next item
+            value = None
+            while stack:
+                items, indent, is_dict = stack[-1]
+                item = next(items, END)
+                if item is not END:
+                    break
+                stack.pop()
+                chunks.append(indent + ('}' if is_dict else ']'))
+                if stack:
+                    chunks.append('\n')
+            if not stack:
+                break
+            
+            if is_dict:
+                key, value = item
+                piece = indent + f'  {key}: '
+                depth = len(indent) + 4 + len(key)
+            else:
+                value = item
+                piece = indent + "  "
+                depth = len(indent) + 2
+            chunks.append(piece)
+            
+            if len(chunks) >= chunk_size:
+                file.write(''.join(chunks))
+                chunks = []
+        
+        file.write(''.join(chunks))
+    
+    ## the representation of a value that isn't a collection
+    def scalar_text(self):
+        if self.type == ValueType.BOOL:
+            return (str)(self.value).lower()
+        if self.type == ValueType.STRING:
+            return f'"{self.value}"'
+        if self.type == ValueType.NULL:
+            return "null"
+        return (str)(self.value)
     
     """For values that aren't collections(not a list or dict), this function 
     returns a string representation of the value with an indent.
@@ -139,7 +228,7 @@ class JSONValue:
         if self.type == ValueType.LIST:
             output = '[\n'
             
-            for values in self.value:
+            for values in list_items(self.value):
                 output += indent + "  " +  values.recursive_print(depth+2) + '\n'
             output += indent + ']'
             
@@ -148,6 +237,168 @@ class JSONValue:
                 
             
             
+## The ValueType of each Python type built in native mode
+NATIVE_TYPES = {
+    str: ValueType.STRING,
+    int: ValueType.INT,
+    float: ValueType.FLOAT,
+    list: ValueType.LIST,
+    dict: ValueType.DICTIONARY,
+    bool: ValueType.BOOL,
+    type(None): ValueType.NULL,
+    Decimal: ValueType.FLOAT,
+}
+
+## In native mode a value is kept as it is instead of being wrapped
+def native_value(type, value):
+    return value
+
+def native_type(value):
+    return NATIVE_TYPES[type(value)]
+
+def native_value_of(value):
+    return value
+
+
+## Typed arrays hold the items of a list of numbers without a JSONValue for each.
+## array.array uses these typecodes. A list of booleans stays a list, as an array
+## would hold 0 and 1 rather than True and False
+ARRAY_TYPECODES = {ValueType.INT: 'q', ValueType.FLOAT: 'd'}
+ARRAY_ITEM_TYPES = {code: value_type for value_type, code in ARRAY_TYPECODES.items()}
+NUMPY_DTYPES = {ValueType.INT: 'int64', ValueType.FLOAT: 'float64'}
+NUMPY_ITEM_TYPES = {'i': ValueType.INT, 'f': ValueType.FLOAT}
+NATIVE_TYPES[array] = ValueType.LIST
+if numpy is not None:
+    NATIVE_TYPES[numpy.ndarray] = ValueType.LIST
+
+## The numbers the typed list fast path converts, joined by commas: integers and
+## decimals that every number rule accepts and that int and float read as parse_num does.
+## Lists of any other numbers are parsed one item at a time
+INT_LEXEMES = re.compile(r'-?(?:0|[1-9][0-9]*)(?:,-?(?:0|[1-9][0-9]*))*')
+FLOAT_LEXEMES = re.compile(r'-?(?:0|[1-9][0-9]*)\.[0-9]+(?:,-?(?:0|[1-9][0-9]*)\.[0-9]+)*')
+
+## Converts the lexemes of a list's items, all numbers, into an array.array or, with
+## kind='numpy', a NumPy array. Returns None if they aren't numbers the fast path
+## accepts, or an integer doesn't fit in 64 bits
+def typed_array(item_type, lexemes, kind):
+    if item_type == ValueType.INT and INT_LEXEMES.fullmatch(','.join(lexemes)):
+        values = map(int, lexemes)
+    elif item_type == ValueType.FLOAT and FLOAT_LEXEMES.fullmatch(','.join(lexemes)):
+        values = map(float, lexemes)
+    else:
+        return None
+    try:
+        if kind == 'numpy':
+            return numpy.fromiter(values, NUMPY_DTYPES[item_type], len(lexemes))
+        return array(ARRAY_TYPECODES[item_type], values)
+    except OverflowError:
+        return None
+
+## Whether a list's value is a typed array rather than a list
+def is_typed_array(items):
+    return type(items) is array or numpy is not None and type(items) is numpy.ndarray
+
+## The ValueType of the items of a typed array
+def typed_item_type(items):
+    if type(items) is array:
+        return ARRAY_ITEM_TYPES[items.typecode]
+    return NUMPY_ITEM_TYPES[items.dtype.kind]
+
+## The items of a list's value as JSONValues. A typed array holds plain numbers,
+## which are wrapped one at a time as they are read
+def list_items(items):
+    if type(items) is list:
+        return items
+    item_type = typed_item_type(items)
+    convert = int if item_type == ValueType.INT else float
+    return (JSONValue(item_type, convert(item)) for item in items)
+
+
+## numbers='float' reads a number as parse_num always has: a number with an exponent
+## is a float, or an int when the float is whole, so big ones lose their last digits
+def float_number(lexeme):
+    if 'e' in lexeme:
+        number = float(lexeme)
+        if number.is_integer():
+            return ValueType.INT, int(number)
+        return ValueType.FLOAT, number
+    if '.' in lexeme:
+        return ValueType.FLOAT, float(lexeme)
+    return ValueType.INT, int(lexeme)
+
+## The most digits a whole number with an exponent can have to be read as an exact int.
+## It is Python's limit on converting between int and str, so 1e999999999 stays a Decimal
+EXACT_INT_DIGITS = 4300
+
+## numbers='exact' reads a number without rounding: decimals are decimal.Decimal,
+## and a number with an exponent is the exact int when it is whole, or else a Decimal.
+## Raises ValueError, as float_number does, for a number that can't be read
+def exact_number(lexeme):
+    try:
+        if 'e' in lexeme:
+            number = Decimal(lexeme)
+            if number.adjusted() < EXACT_INT_DIGITS and number == number.to_integral_value():
+                return ValueType.INT, int(number)
+            return ValueType.FLOAT, number
+        if '.' in lexeme:
+            return ValueType.FLOAT, Decimal(lexeme)
+    ## not a number, or an exponent too large for a Decimal, which float reads as inf or 0
+    except InvalidOperation:
+        return float_number(lexeme)
+    return ValueType.INT, int(lexeme)
+
+NUMBER_READERS = {'float': float_number, 'exact': exact_number}
+
+## The type of a number that lazy_numbers can leave unread: digits with an optional minus
+## sign, and at most one decimal point. Its type is known from the lexeme and reading it
+## can't fail. The digits must be ASCII, as str.isdigit also accepts digits such as '²'
+## that int and float can't read. Returns None for any other number, which is read straight away
+def lazy_number_type(lexeme):
+    digits = lexeme[1:] if lexeme[0] == '-' else lexeme
+    if not digits.isascii():
+        return None
+    if digits.isdigit():
+        return ValueType.INT
+    if 'e' not in digits and digits.replace('.', '', 1).isdigit():
+        return ValueType.FLOAT
+    return None
+
+
+"""A number that keeps its lexeme and is only read the first time its value
+is needed, then keeps the value. loaded is left unset until then, so making
+one costs no more than making a JSONValue. LazyNumber reads the lexeme as
+numbers='float' does, and ExactLazyNumber as numbers='exact' does."""
+class LazyNumber(JSONValue):
+    __slots__ = ('lexeme', 'loaded')
+    read = staticmethod(float_number)
+
+    def __init__(self, type, lexeme):
+        self.type = type
+        self.lexeme = lexeme
+
+    @property
+    def value(self):
+        try:
+            return self.loaded
+        except AttributeError:
+            self.loaded = self.read(self.lexeme)[1]
+            return self.loaded
+
+    @value.setter
+    def value(self, value):
+        self.loaded = value
+
+    ## whether the number has been read yet
+    def is_loaded(self):
+        return hasattr(self, 'loaded')
+
+class ExactLazyNumber(LazyNumber):
+    __slots__ = ()
+    read = staticmethod(exact_number)
+
+LAZY_NUMBERS = {'float': LazyNumber, 'exact': ExactLazyNumber}
+
+            
 """The Tokenizer class handles the scanning and storing of the input tokens"""    
 class Tokenizer:
     
@@ -224,13 +475,226 @@ class Tokenizer:
             return None
 
 
+"""Hands the parser tokens it has already read once more, before going on with
+the tokens of its tokenizer. The typed list fast path reads ahead to the end
+of a list and gives the tokens back this way when the list has to be parsed
+item by item. Once the tokens run out the parser's tokenizer is put back."""
+class ReplayTokens:
+    def __init__(self, parser, tokens, index) -> None:
+        self.parser = parser
+        self.source = parser.tokenizer
+        self.tokens = tokens
+        self.position = 0
+        self.current_index = index
+
+    ## tokens are given back in front of the ones still to be replayed
+    def replay(self, tokens, index):
+        self.tokens = tokens + self.tokens[self.position:]
+        self.position = 0
+        self.current_index = index
+
+    def next_token(self):
+        self.current_index += 1
+        if self.position < len(self.tokens):
+            self.position += 1
+            return self.tokens[self.position - 1]
+        self.parser.tokenizer = self.source
+        return self.source.next_token()
+
+
+"""The TokenStream class gives the parser the same interface as the Tokenizer
+for tokens coming from any iterator, such as Lexer.iter_tokens.
+Tokens are pulled one at a time, so only the current token is held."""
+class TokenStream:
+    def __init__(self, tokens) -> None:
+        self.tokens = iter(tokens)
+        self.current_index = -1
+
+    ## return the next token from the iterator, None once it is exhausted
+    def next_token(self):
+        self.current_index+=1
+        return next(self.tokens, None)
+
+
+"""A SemanticRule is one of the seven semantic checks of the language.
+Each rule runs at one site in the parser:
+    'number': check(parser, token) for every number token
+    'string': check(parser, token) for every string value
+    'key':    check(parser, token) for every dictionary key
+    'pair':   check(parser, dictionary, key) before a pair is added to a dictionary
+    'item':   check(parser, list, value) after a value is added to a list
+and reports its error through Parser.report when the rule is broken."""
+class SemanticRule:
+    SITES = ('number', 'string', 'key', 'pair', 'item')
+    
+    def __init__(self, name, error_type, site, check):
+        self.name = name
+        self.error_type = error_type
+        self.site = site
+        self.check = check
+
+## Raising semantic Error of type 1
+def check_decimal(parser, token):
+    if token.value[0]=='.' or token.value[-1]=='.':
+        parser.report(InvalidDecimalError(token.value))
+
+## Raising semantic error of type 2
+def check_empty_key(parser, token):
+    if token.value.isspace() or token.value == '':
+        parser.report(EmptyKeyError(token.value))
+
+## Raising semantic Error of type 3
+def check_number(parser, token):
+    if token.value[0]=='+' or (len(token.value)!=1 and token.value[0] == '0' and token.value[:2] != '0.'):
+        parser.report(InvalidNumberError(token.value))
+
+## Raising semantic error of type 4
+def check_reserved_key(parser, token):
+    if token.value in ['true', 'false', 'null']:
+        parser.report(ReservedWordAsKeyError(token.value))
+
+## Raising semantic error of type 5
+## the dictionary itself is used to look keys up, so each check is O(1)
+def check_duplicate_key(parser, dictionary, key):
+    if key in dictionary:
+        parser.report(DuplicateKeyError(key))
+
+## Raising semantic error of type 6
+## every value must have the type of the first value in the list
+def check_list_type(parser, list, value):
+    if len(list) > 1 and parser.type_of(value) != parser.type_of(list[0]):
+        shown = parser.value_of(value)
+        ## a typed array is shown as the list it stands for
+        if is_typed_array(shown):
+            shown = [item.value if parser.native else item for item in list_items(shown)]
+        parser.report(ListTypeError(shown))
+
+## Raising semantic Error of type 7
+def check_reserved_word(parser, token):
+    if token.value in ['true', 'false', 'null']:
+        parser.report(ReservedWordError(token.value))
+
+## Every semantic rule by name, in the order of their error types
+SEMANTIC_RULES = {rule.name: rule for rule in [
+    SemanticRule('decimal', 1, 'number', check_decimal),
+    SemanticRule('empty_key', 2, 'key', check_empty_key),
+    SemanticRule('number', 3, 'number', check_number),
+    SemanticRule('reserved_key', 4, 'key', check_reserved_key),
+    SemanticRule('duplicate_key', 5, 'pair', check_duplicate_key),
+    SemanticRule('list_type', 6, 'item', check_list_type),
+    SemanticRule('reserved_word', 7, 'string', check_reserved_word),
+]}
+
+## Named sets of rules for Parser(rules=...). 'trusted' skips every semantic
+## check, for data that is known to be valid already
+RULE_PROFILES = {
+    'strict': tuple(SEMANTIC_RULES),
+    'trusted': (),
+}
+
+
+"""A Diagnostic is an error found while parsing in collect mode,
+along with the index of the token it was found at"""
+class Diagnostic:
+    __slots__ = ('token_index', 'error')
+    
+    def __init__(self, token_index, error):
+        self.token_index = token_index
+        self.error = error
+    
+    def __repr__(self) -> str:
+        return f"Diagnostic({self.token_index}, {self.error!r})"
+
+
+## The states of Parser.parse_iterative
+class ParseState:
+    ## a value is expected at the current token
+    VALUE = "VALUE"
+    ## a key is expected in a dictionary
+    PAIR = "PAIR"
+    ## a colon is expected after a key
+    COLON = "COLON"
+    ## a comma or closing bracket is expected after an item
+    NEXT = "NEXT"
+    ## a value has been parsed and is added to the container around it
+    FINISHED = "FINISHED"
+
+
 """This class handles the parsing of all values in json"""
 class Parser:
-    ## initialize a tokenizer to get the tokens from the given string input
-    def __init__(self, input) -> None:
-        self.tokenizer = Tokenizer(input)
-        self.current_token = None
+    ## the input is either a string of tokens in the ScannerOutput format,
+    ## or any iterator of Token objects such as Lexer.iter_tokens.
+    ## The current token is the parser's one token of lookahead.
+    ## With native=True values are built as plain dict, list, str, int, float,
+    ## bool and None instead of being wrapped in JSONValue objects.
+    ## The same semantic checks run in both modes.
+    ## The engine is 'recursive' (parse_value) or 'iterative' (parse_iterative),
+    ## which gives the same results without a Python frame per nesting level.
+    ENGINES = ('recursive', 'iterative')
+    TYPED_ARRAYS = ('array', 'numpy')
+    
+    ## The semantic rules are a profile name from RULE_PROFILES or
+    ## any collection of names from SEMANTIC_RULES.
+    ## metrics is an optional JsonMetrics.Metrics that collects timings and counts.
+    ## typed_arrays='array' builds a list of integers or decimals as an
+    ## array.array, and 'numpy' as a NumPy array; True picks NumPy when it is installed.
+    ## Its type is still LIST, and it is printed like any other list.
+    ## numbers is 'float' or 'exact', which reads numbers as int and decimal.Decimal without
+    ## rounding. With lazy_numbers each number is a LazyNumber, read when its value is first used
+    def __init__(self, input, native=False, engine='recursive', rules='strict', metrics=None, typed_arrays=False,
+                 numbers='float', lazy_numbers=False) -> None:
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown parser engine '{engine}', expected one of {', '.join(self.ENGINES)}")
+        if numbers not in NUMBER_READERS:
+            raise ValueError(f"Unknown numbers '{numbers}', expected one of {', '.join(NUMBER_READERS)}")
+        if lazy_numbers and native:
+            raise ValueError("Lazy numbers are JSONValues, native=True isn't supported")
+        self.numbers = numbers
+        self.read_number = NUMBER_READERS[numbers]
+        ## the class of the lazy numbers built, or None to read numbers as they are parsed
+        self.lazy_number = LAZY_NUMBERS[numbers] if lazy_numbers else None
+        if typed_arrays is True:
+            typed_arrays = 'array' if numpy is None else 'numpy'
+        if typed_arrays and typed_arrays not in self.TYPED_ARRAYS:
+            raise ValueError(f"Unknown typed arrays '{typed_arrays}', expected one of {', '.join(self.TYPED_ARRAYS)}")
+        if typed_arrays == 'numpy' and numpy is None:
+            raise ValueError("typed_arrays='numpy' needs NumPy, which isn't installed")
+        self.typed_arrays = typed_arrays or None
+        self.engine = engine
+        self.metrics = metrics
+        self.set_rules(rules)
+        self.collect = False
+        self.reset(input)
+
+        ## build(type, value) makes a parsed value, and type_of/value_of read them back.
+        ## The iterative engine collects the items of a container in new_dict() or new_list()
+        self.new_dict = dict
+        self.new_list = list
+        self.native = native
+        if native:
+            self.build = native_value
+            self.type_of = native_type
+            self.value_of = native_value_of
+        else:
+            self.build = JSONValue
+            self.type_of = attrgetter('type')
+            self.value_of = attrgetter('value')
     
+    ## Points the parser at a new input, keeping its engine, rules, mode and metrics,
+    ## so one Parser can parse many documents one after another
+    def reset(self, input):
+        metrics = self.metrics
+        self.diagnostics = []
+        if metrics is None:
+            self.tokenizer = Tokenizer(input) if isinstance(input, str) else TokenStream(input)
+        elif isinstance(input, str):
+            with metrics.stage('tokenizer'):
+                self.tokenizer = Tokenizer(input)
+            metrics.count_token_list(self.tokenizer.tokens)
+        else:
+            self.tokenizer = TokenStream(metrics.count_tokens(input))
+        self.current_token = None
+
     ## get the next token
     def next_token(self):
         current = self.current_token
@@ -251,59 +715,375 @@ class Parser:
     ## the final returned value is a JSONValue object 
     ## which can be infinitely nested with other JSONValues
     def parse(self):
+        if self.metrics is None:
+            return self.parse_document()
+        try:
+            ## the tokens may be scanned as the parser pulls them, and that time is the 'tokens' stage's
+            with self.metrics.stage('parse', exclude='tokens'):
+                parsed_value = self.parse_document()
+        except Exception:
+            self.metrics.document_parsed(failed=True)
+            raise
+        self.metrics.document_parsed()
+        return parsed_value
+    
+    ## parses one value followed by the EOF token
+    def parse_document(self):
         self.next_token()
-        parsed_value = self.parse_value()
-        self.eat(TokenType.EOF)
+        if self.engine == 'iterative' or self.collect:
+            parsed_value = self.parse_iterative()
+        else:
+            parsed_value = self.parse_value()
+        try:
+            self.eat(TokenType.EOF)
+        except UnexpectedTokenError as e:
+            self.report(e)
         return parsed_value
+    
+    ## Parses in collect mode: instead of stopping at the first error, every
+    ## syntax and semantic error is recorded as a Diagnostic and parsing carries on.
+    ## Returns the parsed value along with the list of diagnostics.
+    ## Collect mode always runs the iterative engine, which can resume after any error.
+    ## Errors from scanning the tokens are still raised.
+    def parse_with_diagnostics(self):
+        self.collect = True
+        self.diagnostics = []
+        return self.parse(), self.diagnostics
         
     ## Determines the JSONValue to be returned based on the current token
     def parse_value(self):
+        ## if the token is bracket or brace, call seperate method to parse dict or list
+        if self.current_token.type == TokenType.LBRACE:
+            return self.build(ValueType.DICTIONARY, self.parse_dict())
+        
+        elif self.current_token.type == TokenType.LBRACKET:
+            if self.typed_arrays:
+                value = self.parse_typed_list()
+                if value is not None:
+                    return value
+            return self.build(ValueType.LIST, self.parse_list())
+        
+        return self.parse_scalar()
+    
+    """The fast path for lists with typed_arrays. When the list is a plain run of
+    numbers, its tokens are read up to the closing bracket and converted
+    together into a typed array, with no JSONValue, semantic check or
+    list type check per item. Only numbers that pass every rule take this path.
+    Any other list is given back to be parsed item by item from its opening
+    bracket, so its values and errors are the usual ones, and None is returned."""
+    def parse_typed_list(self):
+        opening = self.current_token
+        index = self.tokenizer.current_index
+        self.next_token()
+        item_type = self.current_token.type
+        tokens = []
+        closed = False
+        if item_type == TokenType.NUM:
+            while self.current_token.type == item_type:
+                tokens.append(self.next_token())
+                if self.current_token.type != TokenType.COMMA:
+                    closed = self.current_token.type == TokenType.RBRACKET
+                    break
+                tokens.append(self.next_token())
+        
+        if closed:
+            lexemes = [token.value for token in tokens[::2]]
+            if '.' not in lexemes[0]:
+                items = typed_array(ValueType.INT, lexemes, self.typed_arrays)
+            ## an array of floats would round the decimals that exact numbers keep
+            elif self.numbers == 'float':
+                items = typed_array(ValueType.FLOAT, lexemes, self.typed_arrays)
+            else:
+                items = None
+            if items is not None:
+                self.next_token()
+                return self.build(ValueType.LIST, items)
+        
+        tokens.append(self.current_token)
+        if type(self.tokenizer) is ReplayTokens:
+            self.tokenizer.replay(tokens, index)
+        else:
+            self.tokenizer = ReplayTokens(self, tokens, index)
+        self.current_token = opening
+        return None
+    
+    ## Parses a value that isn't a list or dictionary
+    def parse_scalar(self):
         if self.current_token.type == TokenType.STRING:
             token = self.eat(TokenType.STRING)
+            for check in self.string_checks:
+                check(self, token)
             
-            ## Raising semantic Error of type 7
-            if token.value in ['true', 'false', 'null']:
-                raise ReservedWordError(token.value)
-            
-            return JSONValue(ValueType.STRING, token.value)    
+            return self.build(ValueType.STRING, token.value)    
             
         elif self.current_token.type == TokenType.BOOL:
             token = self.eat(TokenType.BOOL)
             if token.value == 'true':
-                return JSONValue(ValueType.BOOL, True)
+                return self.build(ValueType.BOOL, True)
             elif token.value == 'false':
-                return JSONValue(ValueType.BOOL, False)
+                return self.build(ValueType.BOOL, False)
             
         elif self.current_token.type == TokenType.NUM:
             return self.parse_num()
             
         elif self.current_token.type == TokenType.NULL:
             self.eat(TokenType.NULL)
-            return JSONValue(ValueType.NULL, None)
-        
-        ## if the token is bracket or brace, call seperate method to parse dict or list
-        elif self.current_token.type == TokenType.LBRACE:
-            return JSONValue(ValueType.DICTIONARY, self.parse_dict())
-        
-        elif self.current_token.type == TokenType.LBRACKET:
-            return JSONValue(ValueType.LIST, self.parse_list())
+            return self.build(ValueType.NULL, None)
         
         ## if none of the tokens matched the expected tokens for a value, throw unexpected token error
         else:
             raise UnexpectedTokenError([TokenType.STRING, TokenType.BOOL, TokenType.NUM, TokenType.NULL, TokenType.LBRACE, TokenType.LBRACKET], self.current_token.type, self.tokenizer.current_index)
         
+    """The iterative engine parses the same grammar as parse_value without recursion.
+    Each list or dictionary being parsed is a frame on an explicit stack:
+    [is_dict, container, key of the current pair].
+    The parser moves between the ParseStates until the outermost value is finished.
+    
+    Error recovery follows the recursive methods exactly. The common cases are
+    decided by looking at the current token. An UnexpectedTokenError raised deeper
+    inside a container's item unwinds the stack to the nearest frame that would
+    have caught it: a dictionary turns a missing value before '}' into null, and
+    a list skips an item at a ',' or ']'. Errors at a container's own keys or
+    closing bracket belong to the container around it.
+    
+    In collect mode an error that no frame recovers from is reported,
+    and resume_after_error picks a place to carry on from."""
+    def parse_iterative(self):
+        steps = self.iterative_steps(0)
+        try:
+            while True:
+                next(steps)
+        except StopIteration as finished:
+            return finished.value
+    
+    ## The iterative engine as a generator, which returns the parsed value.
+    ## Each turn of its loop reads at most one token, and it pauses with a
+    ## bare yield after every budget turns, so a caller can stop between tokens
+    ## and carry on later. With a budget of 0 it runs to the end without pausing
+    def iterative_steps(self, budget):
+        stack = []
+        state = ParseState.VALUE
+        value = None
+        ## whether the current token directly follows an opening bracket
+        opened = False
+        ## counting down from -1 never reaches 0
+        countdown = budget or -1
+        
+        while True:
+            countdown -= 1
+            if countdown == 0:
+                yield
+                countdown = budget
+            try:
+                if state == ParseState.VALUE:
+                    token_type = self.current_token.type
+                    if token_type == TokenType.LBRACE:
+                        self.eat(TokenType.LBRACE)
+                        stack.append([True, self.new_dict(), None])
+                        state = ParseState.PAIR
+                        opened = True
+                    elif token_type == TokenType.LBRACKET:
+                        value = self.parse_typed_list() if self.typed_arrays else None
+                        if value is not None:
+                            state = ParseState.FINISHED
+                        else:
+                            self.eat(TokenType.LBRACKET)
+                            stack.append([False, self.new_list(), None])
+                            opened = True
+                    ## (Error recovery) a missing value in a dictionary is null,
+                    ## and extra commas in a list are skipped
+                    elif stack and stack[-1][0] and token_type == TokenType.RBRACE:
+                        value = self.build(ValueType.NULL, None)
+                        state = ParseState.FINISHED
+                        self.recovered('missing value')
+                    elif stack and not stack[-1][0] and (token_type == TokenType.COMMA or token_type == TokenType.RBRACKET):
+                        state = ParseState.NEXT
+                        if opened and token_type == TokenType.COMMA:
+                            self.recovered('extra comma')
+                    else:
+                        value = self.parse_scalar()
+                        state = ParseState.FINISHED
+                
+                elif state == ParseState.FINISHED:
+                    ## add the finished value to the container around it
+                    if not stack:
+                        return value
+                    opened = False
+                    frame = stack[-1]
+                    if frame[0]:
+                        for check in self.pair_checks:
+                            check(self, frame[1], frame[2])
+                        frame[1][frame[2]] = value
+                    else:
+                        frame[1].append(value)
+                        for check in self.item_checks:
+                            check(self, frame[1], value)
+                    state = ParseState.NEXT
+                
+                elif state == ParseState.PAIR:
+                    key = self.current_token.value
+                    token_type = self.current_token.type
+                    ## (Error recovery) no key or value is given, so there is no pair
+                    if token_type == TokenType.RBRACE or token_type == TokenType.COMMA:
+                        state = ParseState.NEXT
+                        if opened and token_type == TokenType.COMMA:
+                            self.recovered('extra comma')
+                        continue
+                    token = self.eat(TokenType.STRING)
+                    for check in self.key_checks:
+                        check(self, token)
+                    
+                    stack[-1][2] = key
+                    state = ParseState.COLON
+                
+                elif state == ParseState.COLON:
+                    ## (Error recovery) if colon is not found, try semicolon.
+                    ## With neither before the closing brace, the value is null
+                    token_type = self.current_token.type
+                    if token_type == TokenType.COLON:
+                        self.eat(TokenType.COLON)
+                    elif token_type != TokenType.RBRACE:
+                        self.eat(TokenType.SEMICOLON)
+                        self.recovered('semicolon')
+                    state = ParseState.VALUE
+                
+                elif state == ParseState.NEXT:
+                    ## either another item follows a comma, or the container is closed
+                    is_dict = stack[-1][0]
+                    closing = TokenType.RBRACE if is_dict else TokenType.RBRACKET
+                    opened = False
+                    if self.current_token.type == TokenType.COMMA:
+                        self.eat(TokenType.COMMA)
+                        state = ParseState.PAIR if is_dict else ParseState.VALUE
+                        if self.current_token.type == TokenType.COMMA or self.current_token.type == closing:
+                            self.recovered('extra comma')
+                    else:
+                        self.eat(closing)
+                        value = self.close_container(stack.pop())
+                        state = ParseState.FINISHED
+            
+            except UnexpectedTokenError as e:
+                ## unwind to the nearest container that recovers from this token
+                if state == ParseState.VALUE or state == ParseState.COLON:
+                    index = len(stack) - 1
+                else:
+                    index = len(stack) - 2
+                while index >= 0:
+                    if stack[index][0]:
+                        if e.given_type == TokenType.RBRACE:
+                            break
+                    elif e.given_type == TokenType.COMMA or e.given_type == TokenType.RBRACKET:
+                        break
+                    index -= 1
+                if index >= 0:
+                    ## the containers inside the one that recovers are dropped first
+                    if index < len(stack) - 1:
+                        self.discard(len(stack) - 1 - index)
+                        del stack[index+1:]
+                    if stack[index][0]:
+                        value = self.build(ValueType.NULL, None)
+                        state = ParseState.FINISHED
+                        self.recovered('missing value')
+                    else:
+                        state = ParseState.NEXT
+                        self.recovered('skipped item')
+                else:
+                    self.report(e)
+                    state, value = self.resume_after_error(stack, state)
+    
+    ## In collect mode, decides where parse_iterative carries on from after an error
+    ## that no container recovers from. Tokens that can't be used are skipped, and
+    ## missing values, colons, commas and closing brackets are assumed to be there.
+    def resume_after_error(self, stack, state):
+        token_type = self.current_token.type
+        closing = [TokenType.RBRACE, TokenType.RBRACKET, TokenType.EOF]
+        
+        if state == ParseState.COLON:
+            return ParseState.VALUE, None
+        
+        if state == ParseState.VALUE:
+            if token_type in closing or token_type == TokenType.COMMA:
+                return ParseState.FINISHED, self.build(ValueType.NULL, None)
+            self.next_token()
+            return ParseState.VALUE, None
+        
+        if state == ParseState.PAIR and token_type not in closing:
+            self.next_token()
+            return ParseState.PAIR, None
+        
+        ## a comma is missing between two items
+        if state == ParseState.NEXT and token_type not in closing:
+            return (ParseState.PAIR if stack[-1][0] else ParseState.VALUE), None
+        
+        ## the container's closing bracket is missing
+        return ParseState.FINISHED, self.close_container(stack.pop())
+    
+    ## Called by the iterative engine when error recovery abandons the innermost
+    ## count containers it was building. Their frames are simply dropped, so there
+    ## is nothing to do here; the EventParser tells its handler
+    def discard(self, count):
+        pass
+
+    ## Builds the value of a list or dictionary frame once it has been closed
+    def close_container(self, frame):
+        ## cannot have empty dictionary or list according to grammer
+        if frame[0]:
+            if len(frame[1])==0:
+                self.report(EmptyDictionaryError(self.tokenizer.current_index, self.current_token.type))
+            return self.build(ValueType.DICTIONARY, frame[1])
+        if len(frame[1])==0:
+            self.report(EmptyListError(self.tokenizer.current_index, self.current_token.type))
+        return self.build(ValueType.LIST, frame[1])
+    
+    ## Chooses the semantic rules that run, grouped by the site they run at
+    def set_rules(self, rules):
+        if isinstance(rules, str):
+            if rules not in RULE_PROFILES:
+                raise ValueError(f"Unknown rule profile '{rules}', expected one of {', '.join(RULE_PROFILES)}")
+            rules = RULE_PROFILES[rules]
+        for name in rules:
+            if name not in SEMANTIC_RULES:
+                raise ValueError(f"Unknown semantic rule '{name}', expected one of {', '.join(SEMANTIC_RULES)}")
+        
+        self.rules = tuple(name for name in SEMANTIC_RULES if name in rules)
+        checks = {site: [] for site in SemanticRule.SITES}
+        for name in self.rules:
+            rule = SEMANTIC_RULES[name]
+            checks[rule.site].append(rule.check if self.metrics is None else self.metrics.counted_check(rule))
+        self.number_checks = tuple(checks['number'])
+        self.string_checks = tuple(checks['string'])
+        self.key_checks = tuple(checks['key'])
+        self.pair_checks = tuple(checks['pair'])
+        self.item_checks = tuple(checks['item'])
+    
+    ## In strict mode an error is raised straight away. In collect mode
+    ## it is recorded with the index of the current token, and parsing carries on
+    def report(self, error):
+        if not self.collect:
+            raise error
+        self.diagnostics.append(Diagnostic(self.tokenizer.current_index, error))
+        if self.metrics is not None:
+            self.metrics.count_diagnostic()
+    
+    ## Counts an error the parser recovered from, when metrics are being collected.
+    ## This is only called on the recovery paths, so valid input never reaches it
+    def recovered(self, kind):
+        if self.metrics is not None:
+            self.metrics.count_recovery(kind)
     
     ## method that handles the parsing of dictionaries
     def parse_dict(self):
         self.eat(TokenType.LBRACE)
         dictionary = {}
-        keys = []
         
         ## get the first pair in the dictionary
         pair = self.parse_pair()
         if pair is not None:
+            for check in self.pair_checks:
+                check(self, dictionary, pair[0])
             dictionary[pair[0]] = pair[1]
-            keys.append(pair[0])
+        elif self.current_token.type == TokenType.COMMA:
+            self.recovered('extra comma')
             
         ## get any following pairs seperated by a comma
         while self.current_token.type == TokenType.COMMA:
@@ -313,11 +1093,11 @@ class Parser:
             ## if the returned pair is None (no pair was given between comma's)
             ## don't add it to the dict
             if pair is not None:
-                ## Raising error of type 5
-                if pair[0] in keys:
-                    raise DuplicateKeyError(pair[0])
+                for check in self.pair_checks:
+                    check(self, dictionary, pair[0])
                 dictionary[pair[0]] = pair[1]
-                keys.append(pair[0])
+            else:
+                self.recovered('extra comma')
         
         self.eat(TokenType.RBRACE)
         
@@ -331,42 +1111,39 @@ class Parser:
     ## method that handles parsing of pairs specifically
     def parse_pair(self):
         key = self.current_token.value
-        token = None
         ## (Error recovery)
         ## handling error where neither a key or value is given
         ## return empty pair
-        try:
-            token = self.eat(TokenType.STRING)
-        except UnexpectedTokenError as e:
-            if e.given_type == TokenType.RBRACE or e.given_type == TokenType.COMMA:
-                return None
-            else:
-                raise e
-        
-        ## Raising semantic error of type 2
-        if key.isspace() or key == '':
-            raise EmptyKeyError(token.value)
-        
-        ## Raising semantic error of type 4
-        if key in ['true', 'false', 'null']:
-            raise ReservedWordAsKeyError(token.value)
+        if self.current_token.type == TokenType.RBRACE or self.current_token.type == TokenType.COMMA:
+            return None
+        token = self.eat(TokenType.STRING)
+        for check in self.key_checks:
+            check(self, token)
         
         ## (Error recovery)
         ## handling error where a value isn't given
         ## for a pair in a dictionary.
         ## assumed to be null.
+        ## The common cases are found by looking at the current token, and the
+        ## except below only handles a closing brace found deeper inside the value
         try:
             ## (Error recovery)
             ## if colon is not found, try semicolon
-            try:
+            if self.current_token.type == TokenType.COLON:
                 self.eat(TokenType.COLON)
-            except Exception:
+            elif self.current_token.type != TokenType.RBRACE:
                 self.eat(TokenType.SEMICOLON)
-                
-            value = self.parse_value()
+                self.recovered('semicolon')
+            
+            if self.current_token.type == TokenType.RBRACE:
+                value = self.build(ValueType.NULL, None)
+                self.recovered('missing value')
+            else:
+                value = self.parse_value()
         except UnexpectedTokenError as e:
             if e.given_type == TokenType.RBRACE:
-                value = JSONValue(ValueType.NULL, None)
+                value = self.build(ValueType.NULL, None)
+                self.recovered('missing value')
             else:
                 raise e
         return (key, value)
@@ -375,32 +1152,38 @@ class Parser:
     def parse_list(self):
         self.eat(TokenType.LBRACKET)
         list = []
-        type = ""
         
         ## handling common error where extra commas may be given preceeding
-        ## if a comma token has been found instead of a string, skip the token and continue
-        try:
-            list.append(self.parse_value())
-            type = list[-1].type
-        except UnexpectedTokenError as e:
-            if e.given_type != TokenType.COMMA and e.given_type != TokenType.RBRACKET:
-                raise e
+        ## if a comma token has been found instead of a string, skip the token and continue.
+        ## The except only handles a comma or bracket found deeper inside the value
+        if self.current_token.type == TokenType.COMMA:
+            self.recovered('extra comma')
+        elif self.current_token.type != TokenType.RBRACKET:
+            try:
+                list.append(self.parse_value())
+                for check in self.item_checks:
+                    check(self, list, list[-1])
+            except UnexpectedTokenError as e:
+                if e.given_type != TokenType.COMMA and e.given_type != TokenType.RBRACKET:
+                    raise e
+                self.recovered('skipped item')
             
         while self.current_token.type == TokenType.COMMA:
             self.eat(TokenType.COMMA)
             ## handling common error where extra commas may be given
             ## if a comma token has been found instead of a string, skip the token and continue
+            if self.current_token.type == TokenType.COMMA or self.current_token.type == TokenType.RBRACKET:
+                self.recovered('extra comma')
+                continue
             try:
                 list.append(self.parse_value())
-                if type == "":
-                    type = list[-1].type
-                ## Raising semantic error of type 6
-                elif type != list[-1].type:
-                    raise ListTypeError(list[-1].value)
+                for check in self.item_checks:
+                    check(self, list, list[-1])
                 
             except UnexpectedTokenError as e:
                 if e.given_type != TokenType.COMMA and e.given_type != TokenType.RBRACKET:
                     raise e
+                self.recovered('skipped item')
                 
         self.eat(TokenType.RBRACKET)
         
@@ -412,36 +1195,92 @@ class Parser:
         
     def parse_num(self):
         token = self.eat(TokenType.NUM)
+        for check in self.number_checks:
+            check(self, token)
+        if self.lazy_number is not None or self.numbers != 'float':
+            return self.read_num(token.value)
         
-        ## Raising semantic Error of type 1
-        if token.value[0]=='.' or token.value[-1]=='.':
-            raise InvalidDecimalError(token.value)
-        
-        ## Raising semantic Error of type 3
-        if token.value[0]=='+' or (len(token.value)!=1 and token.value[0] == '0' and token.value[:2] != '0.'):
-            raise InvalidNumberError(token.value)
-        
-        if 'e' in token.value:
-            ##If the scientific value is a whole number, return as integer
-            if (float)(token.value).is_integer():
-                return JSONValue(ValueType.INT, (int)((float)(token.value)))
+        try:
+            if 'e' in token.value:
+                ##If the scientific value is a whole number, return as integer
+                if (float)(token.value).is_integer():
+                    return self.build(ValueType.INT, (int)((float)(token.value)))
+                
+                return self.build(ValueType.FLOAT, (float)(token.value))
+            elif '.' in token.value:
+                return self.build(ValueType.FLOAT, (float)(token.value))
             
-            return JSONValue(ValueType.FLOAT, (float)(token.value))
-        elif '.' in token.value:
-            return JSONValue(ValueType.FLOAT, (float)(token.value))
-        
-        else:
-            return JSONValue(ValueType.INT, (int)(token.value))
+            else:
+                return self.build(ValueType.INT, (int)(token.value))
+        ## a number the scanner accepts but Python can't convert, such as '1-2'.
+        ## In collect mode it is reported and parsed as null
+        except ValueError as e:
+            self.report(e)
+            return self.build(ValueType.NULL, None)
+    
+    ## parse_num with the numbers and lazy_numbers options. A number that
+    ## can't be read is reported when it is parsed, as it is by parse_num
+    def read_num(self, lexeme):
+        if self.lazy_number is not None:
+            value_type = lazy_number_type(lexeme)
+            if value_type is not None:
+                return self.lazy_number(value_type, lexeme)
+        try:
+            value_type, value = self.read_number(lexeme)
+        except ValueError as e:
+            self.report(e)
+            return self.build(ValueType.NULL, None)
+        return self.build(value_type, value)
         
         
 
-def main():
+## Parses a stream of Token objects, such as the output of Lexer.iter_tokens.
+## If a file object is given as dump, the tokens are also written to it
+## in the ScannerOutput format for debugging. Other keyword options go to the Parser.
+def parse_tokens(tokens, dump=None, **options):
+    if dump is not None:
+        tokens = JsonScanner.dump_tokens(tokens, dump)
+    return Parser(tokens, **options).parse()
+
+## Parses JSON text by feeding the Lexer's tokens straight into the Parser,
+## skipping the ScannerOutput text round trip.
+def parse_text(text, dump=None, **options):
+    return parse_tokens(JsonScanner.Lexer().iter_tokens(text), dump, **options)
+
+## Parses JSON text like parse_text, but collects every error instead of stopping
+## at the first one. Returns the parsed value and the list of Diagnostics.
+def diagnose_text(text, **options):
+    return Parser(JsonScanner.Lexer().iter_tokens(text), **options).parse_with_diagnostics()
+
+## Parses a binary token file written by JsonScanner.write_token_file.
+## The file is memory-mapped and its tokens are read as the parser needs them
+def parse_token_file(path, **options):
+    with JsonScanner.TokenFile(path) as token_file:
+        return Parser(token_file, **options).parse()
+
+## Reads a JSON file the same way the scanner does and parses it with parse_text.
+## With mapped=True the file is scanned as bytes through a memory map instead,
+## so it is never held in memory as one decoded string.
+def parse_file(path, dump=None, mapped=False, **options):
+    if mapped:
+        return parse_tokens(JsonScanner.Lexer().iter_file_tokens(path), dump, **options)
+    with open(path, 'r') as file:
+        text = file.read().strip()
+    return parse_text(text, dump, **options)
+
+
+## metrics, if given, is a JsonMetrics.Metrics that times every stage of every file
+def main(metrics=None):
     
     ## Comment out the line below to input your own tokens into the ScannerOutput files!
     ## if not commented, the scanner will be run each time and the ScannerOutput files
     ## will be replaced with the tokens read from ScannerInput files.
     
-    JsonScanner.main()
+    if metrics is None:
+        JsonScanner.main()
+    else:
+        with metrics.stage('scanner'):
+            JsonScanner.main()
     
     ##Go through each input file (ScannerOutput), get the parsers output,
     ##and store output in a file
@@ -452,10 +1291,14 @@ def main():
             try:
                 with open(file_name, 'r') as file:
                     input_string = file.read()
-                    parser = Parser(input_string)
+                    parser = Parser(input_string, metrics=metrics)
+                parsed_value = parser.parse()
                 with open(f'ParserOutputs/ParserOutput{i:02d}.txt', 'w') as f:
-                    output_string = parser.parse().__repr__()
-                    f.write(output_string)
+                    ## the tree is streamed into the file rather than built as one string
+                    if isinstance(parsed_value, JSONValue):
+                        parsed_value.write(f, metrics=metrics)
+                    else:
+                        f.write(repr(parsed_value))
             except Exception as e:
                 with open(f'ParserOutputs/ParserOutput{i:02d}.txt', 'w') as f:
                     output_string = repr(e)
@@ -0,0 +1,337 @@
+"""Extracts the values at a few paths of a document without parsing the rest.
+
+Paths are JSON Pointers, where a '*' segment matches every key of a dictionary
+or every index of a list:
+    for pointer, value in extract_text(text, ['/meta/id', '/items/*/price']):
+        print(pointer, value)
+The tokens are read one at a time, straight from the Lexer. Containers on the
+way to a path are walked without being built, and every value that no path
+can reach is skipped by counting brackets, so no JSONValue is made for it.
+Only the values at the paths are parsed, with the ordinary Parser methods and
+semantic rules, and each is yielded as soon as it has been read. Filtering a
+huge list therefore needs memory for one matching value at a time.
+
+The containers that are walked rather than parsed recover from errors as the
+Parser does, and their keys and items go through the duplicate_key and
+list_type rules. A value yielded from inside a container that error recovery
+later drops stays yielded. Tokens inside skipped values are not checked
+beyond their brackets."""
+import argparse
+import json
+import sys
+
+from JsonScanner import Lexer, TokenType
+from JsonParser import Parser, ParseState, UnexpectedTokenError, EmptyDictionaryError, EmptyListError, ValueType, RULE_PROFILES, list_items
+
+## The tokens a scalar value can be
+SCALAR_TYPES = frozenset([TokenType.STRING, TokenType.NUM, TokenType.BOOL, TokenType.NULL])
+## Every token a value can start with, as UnexpectedTokenError lists them
+VALUE_TYPES = [TokenType.STRING, TokenType.BOOL, TokenType.NUM, TokenType.NULL, TokenType.LBRACE, TokenType.LBRACKET]
+## The type of the value each token other than a number starts
+TOKEN_VALUE_TYPES = {TokenType.STRING: ValueType.STRING, TokenType.BOOL: ValueType.BOOL, TokenType.NULL: ValueType.NULL,
+                     TokenType.LBRACE: ValueType.DICTIONARY, TokenType.LBRACKET: ValueType.LIST}
+## A value of each type, which only its type is ever read from
+STAND_INS = {ValueType.STRING: '', ValueType.INT: 0, ValueType.FLOAT: 0.0, ValueType.BOOL: False,
+             ValueType.NULL: None, ValueType.DICTIONARY: {}, ValueType.LIST: []}
+
+
+## Splits a JSON Pointer into its segments. '' is the whole document,
+## and '~1' and '~0' in a segment stand for '/' and '~'
+def compile_path(pointer):
+    if pointer == '':
+        return ()
+    if not pointer.startswith('/'):
+        raise ValueError(f"The path '{pointer}' doesn't start with '/'")
+    return tuple(segment.replace('~1', '/').replace('~0', '~') for segment in pointer[1:].split('/'))
+
+## Joins the keys and list indexes of a path back into a JSON Pointer
+def format_path(path):
+    return ''.join('/' + str(segment).replace('~', '~0').replace('/', '~1') for segment in path)
+
+## The queries whose next segment matches the key or list index
+def matching(queries, depth, segment):
+    segment = str(segment)
+    return [query for query in queries if query[depth] == '*' or query[depth] == segment]
+
+
+"""A Parser that yields the (JSON Pointer, value) pairs of the values at the
+given paths instead of parsing the whole document. The input and options are
+those of the Parser. Values are JSONValues, or native objects with native=True.
+
+The walk down to the paths moves between the ParseStates as parse_iterative
+does, and keeps a stack with one frame per open container:
+[is_dict, queries that can still match below it, number of items added, seen].
+seen is the set of keys added to a dictionary, for the duplicate_key rule, and
+the first item of a list, for the list_type rule. An item that is walked or
+skipped is stood in for by a value of the type it would be parsed as.
+Each query is the tuple of its segments, and a query matches a value when
+its first len(path) segments match the path to that value."""
+class PathExtractor(Parser):
+    def __init__(self, input, paths, **options) -> None:
+        super().__init__(input, **options)
+        self.queries = [compile_path(path) for path in paths]
+
+    ## Yields the pointer and value of every value at one of the paths, in document order.
+    ## A value matched by several paths is yielded once.
+    ## Error recovery follows parse_iterative: an UnexpectedTokenError unwinds the
+    ## stack to the nearest frame that would have caught it
+    def extract(self):
+        self.next_token()
+        stack = []
+        path = []
+        queries = self.queries
+        state = ParseState.VALUE
+        value = None
+        ## whether the current token directly follows an opening bracket
+        opened = False
+
+        while True:
+            try:
+                if state == ParseState.VALUE:
+                    ## the current token starts the value at path, and queries are the ones that match path
+                    token_type = self.current_token.type
+                    frame = stack[-1] if stack else None
+                    ## (Error recovery) a missing value in a dictionary is null,
+                    ## and extra commas in a list are skipped
+                    if frame is not None and frame[0] and token_type == TokenType.RBRACE:
+                        value = self.build(ValueType.NULL, None)
+                        state = ParseState.FINISHED
+                        self.recovered('missing value')
+                        if any(len(query) == len(path) for query in queries):
+                            yield format_path(path), value
+                        continue
+                    if frame is not None and not frame[0] and (token_type == TokenType.COMMA or token_type == TokenType.RBRACKET):
+                        path.pop()
+                        state = ParseState.NEXT
+                        if opened and token_type == TokenType.COMMA:
+                            self.recovered('extra comma')
+                        continue
+
+                    ## an item that isn't built is stood in for by the list's first item when it has
+                    ## the same type. One of another type is built, so the list_type error can show it
+                    value = None
+                    mismatched = False
+                    if frame is not None and not frame[0] and self.item_checks:
+                        value_type = self.value_type()
+                        if frame[2] == 0:
+                            value = None if value_type is None else self.stand_in(value_type)
+                        elif value_type == self.type_of(frame[3]):
+                            value = frame[3]
+                        else:
+                            mismatched = value_type is not None
+                    if mismatched or any(len(query) == len(path) for query in queries):
+                        value = self.parse_iterative() if self.engine == 'iterative' else self.parse_value()
+                        yield from self.select(value, queries, path)
+                        state = ParseState.FINISHED
+                    elif queries and (token_type == TokenType.LBRACE or token_type == TokenType.LBRACKET):
+                        self.next_token()
+                        is_dict = token_type == TokenType.LBRACE
+                        stack.append([is_dict, queries, 0, set() if is_dict and self.pair_checks else None])
+                        opened = True
+                        if is_dict:
+                            state = ParseState.PAIR
+                        else:
+                            queries = matching(queries, len(path), 0)
+                            path.append(0)
+                    else:
+                        self.skip_value()
+                        state = ParseState.FINISHED
+
+                elif state == ParseState.FINISHED:
+                    ## add the finished value to the container around it, which only counts it
+                    if not stack:
+                        self.eat(TokenType.EOF)
+                        return
+                    opened = False
+                    frame = stack[-1]
+                    if frame[0]:
+                        for check in self.pair_checks:
+                            check(self, frame[3], path[-1])
+                        if frame[3] is not None:
+                            frame[3].add(path[-1])
+                    else:
+                        if frame[2] == 0:
+                            frame[3] = value
+                        for check in self.item_checks:
+                            check(self, (frame[3], value) if frame[2] > 0 else (value,), value)
+                    frame[2] += 1
+                    path.pop()
+                    state = ParseState.NEXT
+
+                elif state == ParseState.PAIR:
+                    token_type = self.current_token.type
+                    ## (Error recovery) no key or value is given, so there is no pair
+                    if token_type == TokenType.RBRACE or token_type == TokenType.COMMA:
+                        state = ParseState.NEXT
+                        if opened and token_type == TokenType.COMMA:
+                            self.recovered('extra comma')
+                        continue
+                    token = self.eat(TokenType.STRING)
+                    for check in self.key_checks:
+                        check(self, token)
+                    queries = matching(stack[-1][1], len(path), token.value)
+                    path.append(token.value)
+                    state = ParseState.COLON
+
+                elif state == ParseState.COLON:
+                    ## (Error recovery) if colon is not found, try semicolon.
+                    ## With neither before the closing brace, the value is null
+                    token_type = self.current_token.type
+                    if token_type == TokenType.COLON:
+                        self.eat(TokenType.COLON)
+                    elif token_type != TokenType.RBRACE:
+                        self.eat(TokenType.SEMICOLON)
+                        self.recovered('semicolon')
+                    state = ParseState.VALUE
+
+                elif state == ParseState.NEXT:
+                    ## either another item follows a comma, or the container is closed
+                    frame = stack[-1]
+                    closing = TokenType.RBRACE if frame[0] else TokenType.RBRACKET
+                    opened = False
+                    if self.current_token.type == TokenType.COMMA:
+                        self.eat(TokenType.COMMA)
+                        if self.current_token.type == TokenType.COMMA or self.current_token.type == closing:
+                            self.recovered('extra comma')
+                        if frame[0]:
+                            state = ParseState.PAIR
+                        else:
+                            ## list indexes count the items added, as they do in the parsed list
+                            queries = matching(frame[1], len(path), frame[2])
+                            path.append(frame[2])
+                            state = ParseState.VALUE
+                    else:
+                        self.eat(closing)
+                        if frame[2] == 0:
+                            error_type = EmptyDictionaryError if frame[0] else EmptyListError
+                            raise error_type(self.tokenizer.current_index, self.current_token.type)
+                        stack.pop()
+                        if stack and not stack[-1][0] and self.item_checks:
+                            parent = stack[-1]
+                            value = parent[3] if parent[2] > 0 else self.stand_in(ValueType.DICTIONARY if frame[0] else ValueType.LIST)
+                        state = ParseState.FINISHED
+
+            except UnexpectedTokenError as e:
+                ## unwind to the nearest container that recovers from this token
+                if state == ParseState.VALUE or state == ParseState.COLON:
+                    index = len(stack) - 1
+                else:
+                    index = len(stack) - 2
+                while index >= 0:
+                    if stack[index][0]:
+                        if e.given_type == TokenType.RBRACE:
+                            break
+                    elif e.given_type == TokenType.COMMA or e.given_type == TokenType.RBRACKET:
+                        break
+                    index -= 1
+                if index < 0:
+                    raise e
+                ## the containers inside the one that recovers are dropped. Values
+                ## already yielded from inside them stay yielded
+                del stack[index+1:]
+                del path[index+1:]
+                if stack[index][0]:
+                    value = self.build(ValueType.NULL, None)
+                    state = ParseState.FINISHED
+                    self.recovered('missing value')
+                    if any(len(query) == len(path) for query in matching(stack[index][1], index, path[index])):
+                        yield format_path(path), value
+                else:
+                    path.pop()
+                    state = ParseState.NEXT
+                    self.recovered('skipped item')
+
+    ## A value of the given type, for the list_type rule to compare the items
+    ## of a list with when its first item is walked or skipped rather than built
+    def stand_in(self, value_type):
+        return self.build(value_type, STAND_INS[value_type])
+
+    ## The type the value that starts at the current token would be parsed as. A number
+    ## is read without its checks, and one that can't be read is null, as it is in
+    ## collect mode. Returns None if the token can't start a value
+    def value_type(self):
+        token = self.current_token
+        if token.type == TokenType.NUM:
+            try:
+                return self.read_number(token.value)[0]
+            except ValueError:
+                return ValueType.NULL
+        return TOKEN_VALUE_TYPES.get(token.type)
+
+    ## Yields the pointer and value of everything matched below an already built value
+    def select(self, value, queries, path):
+        depth = len(path)
+        if any(len(query) == depth for query in queries):
+            yield format_path(path), value
+        deeper = [query for query in queries if len(query) > depth]
+        if not deeper:
+            return
+        value_type = self.type_of(value)
+        if value_type == ValueType.DICTIONARY:
+            items = self.value_of(value).items()
+        elif value_type == ValueType.LIST:
+            items = self.value_of(value)
+            items = enumerate(items if self.native else list_items(items))
+        else:
+            return
+        for segment, item in items:
+            matched = matching(deeper, depth, segment)
+            if matched:
+                yield from self.select(item, matched, path + [segment])
+
+    ## Skips the value that starts at the current token without building it.
+    ## A container is skipped by counting brackets until the one that closes it
+    def skip_value(self):
+        token_type = self.current_token.type
+        if token_type in SCALAR_TYPES:
+            self.next_token()
+            return
+        if token_type != TokenType.LBRACE and token_type != TokenType.LBRACKET:
+            raise UnexpectedTokenError(VALUE_TYPES, token_type, self.tokenizer.current_index)
+        depth = 0
+        while True:
+            if token_type == TokenType.LBRACE or token_type == TokenType.LBRACKET:
+                depth += 1
+            elif token_type == TokenType.RBRACE or token_type == TokenType.RBRACKET:
+                depth -= 1
+            elif token_type == TokenType.EOF:
+                raise UnexpectedTokenError([TokenType.RBRACE, TokenType.RBRACKET], token_type, self.tokenizer.current_index)
+            self.next_token()
+            if depth == 0:
+                return
+            token_type = self.current_token.type
+
+
+## Extracts the paths from a stream of Token objects, such as Lexer.iter_tokens.
+## Other keyword options go to the Parser
+def extract_tokens(tokens, paths, **options):
+    return PathExtractor(tokens, paths, **options).extract()
+
+## Extracts the paths from JSON text, reading the Lexer's tokens as they are scanned
+def extract_text(text, paths, **options):
+    return extract_tokens(Lexer(record_symbols=False).iter_tokens(text), paths, **options)
+
+## Extracts the paths from a JSON file. With mapped=True the file is scanned
+## as bytes through a memory map, so it is never read into memory at once
+def extract_file(path, paths, mapped=False, **options):
+    if mapped:
+        return extract_tokens(Lexer(record_symbols=False).iter_file_tokens(path), paths, **options)
+    with open(path, 'r') as file:
+        text = file.read().strip()
+    return extract_text(text, paths, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='JSON file')
+    parser.add_argument('paths', nargs='+', help="JSON Pointers, where '*' matches any key or index")
+    parser.add_argument('--rules', choices=list(RULE_PROFILES), default='strict', help='semantic rule profile')
+    args = parser.parse_args()
+
+    ## values are built as native objects so they can be written as JSON
+    for pointer, value in extract_file(args.input, args.paths, mapped=True, native=True, rules=args.rules):
+        sys.stdout.write(f"{pointer}\t{json.dumps(value)}\n")
+
+
+if __name__ == "__main__":
+    main()
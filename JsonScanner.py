@@ -1,5 +1,10 @@
+import mmap
 import os
+import re
+import struct
+import sys
 import traceback
+from array import array
 
 class TokenType:
     STRING = 'STR'
@@ -15,7 +20,74 @@ class TokenType:
     RBRACE = 'RBRACE'
     SEMICOLON = 'SEMICOLON'
 
+## Span of characters accepted by the number DFA (digits, signs, points and exponents)
+NUMBER_SPAN = re.compile(r'[0-9+\-.e]*')
+## Runs of characters the null and boolean DFAs keep reading
+NULL_RUN = re.compile(r'[nul]*')
+BOOL_RUN = re.compile(r'[truefals]*')
+
+## One alternation for every token the DFAs accept, used by the 'regex' backend.
+## Leading whitespace is skipped by the same match and group names are the token types.
+## The lookaheads reject the same continuations the DFAs reject (a boolean followed by
+## another boolean character, a number followed by a non-ASCII character that might
+## be a digit) so those fall back to the DFAs.
+MASTER_PATTERN = re.compile(r'''\s*(?:
+      (?P<STR>"(?P<BODY>[^"]*)")
+    | (?P<NUM>[0-9+\-.][0-9+\-.e]*(?![0-9+\-.e]|[^\x00-\x7f]))
+    | (?P<LBRACE>\{)
+    | (?P<RBRACE>\})
+    | (?P<LBRACKET>\[)
+    | (?P<RBRACKET>\])
+    | (?P<COMMA>,)
+    | (?P<COLON>:)
+    | (?P<SEMICOLON>;)
+    | (?P<BOOL>(?:true|false)(?![truefals]))
+    | (?P<NULL>null(?![nul]))
+)''', re.VERBOSE)
+
+## Tables for scanning UTF-8 bytes. Whitespace is the ASCII characters str.isspace accepts
+BYTE_WHITESPACE = re.compile(rb'[ \t\n\r\x0b\x0c\x1c-\x1f]*')
+BYTE_NUMBER_SPAN = re.compile(rb'[0-9+\-.e]*')
+BYTE_STRING_BODY = re.compile(rb'[^"]*')
+BYTE_NULL_RUN = re.compile(rb'[nul]*')
+BYTE_NUMBER_START = frozenset(b'0123456789-.+')
+BOOL_RUN_BYTES = frozenset(b'truefals')
+BOOL_BYTES = {ord('t'): b'true', ord('f'): b'false'}
+QUOTE_BYTE = ord('"')
+NULL_BYTE = ord('n')
+BYTE_SINGLE_TOKENS = {
+    ord('{'): TokenType.LBRACE,
+    ord('}'): TokenType.RBRACE,
+    ord('['): TokenType.LBRACKET,
+    ord(']'): TokenType.RBRACKET,
+    ord(','): TokenType.COMMA,
+    ord(':'): TokenType.COLON,
+    ord(';'): TokenType.SEMICOLON,
+}
+BYTE_TOKEN_VALUES = {token_type: chr(byte) for byte, token_type in BYTE_SINGLE_TOKENS.items()}
+
+## Returns the position just past the number lexeme that starts at `start`
+def number_end(text, start):
+    end = NUMBER_SPAN.match(text, start).end()
+
+    ## str.isdigit also accepts non-ASCII digits, which the pattern doesn't cover
+    while end < len(text) and text[end].isdigit():
+        end = NUMBER_SPAN.match(text, end + 1).end()
+    return end
+
+## Small integer codes for the token types, used by TokenBuffer
+TOKEN_TYPES = (TokenType.STRING, TokenType.NUM, TokenType.BOOL, TokenType.NULL, TokenType.EOF,
+               TokenType.LBRACKET, TokenType.RBRACKET, TokenType.COMMA, TokenType.COLON,
+               TokenType.LBRACE, TokenType.RBRACE, TokenType.SEMICOLON)
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+## Values of the tokens whose value doesn't depend on the source
+FIXED_VALUES = {TokenType.NULL: 'null', TokenType.EOF: TokenType.EOF, TokenType.LBRACKET: '[',
+                TokenType.RBRACKET: ']', TokenType.COMMA: ',', TokenType.COLON: ':',
+                TokenType.LBRACE: '{', TokenType.RBRACE: '}', TokenType.SEMICOLON: ';'}
+
 class Token:
+    __slots__ = ('type', 'value')
+
     def __init__(self, type, value):
         self.type = type
         self.value = value
@@ -35,17 +107,24 @@ class LexerError(Exception):
 
 class EndOfInputError(Exception):
     def __init__(self, position, string) -> None:
+        self.position = position
+        self.string = string
         super().__init__(f"Lexer reached end of input while tokenizing lexeme: {string} at position {position}\nTry adding Quotation marks at the end if it's a string.")
         
         
 class Lexer: 
-    def __init__(self, input) -> None:
-        self.symbol_table = {}
-        self.input = input
-        self.current_char = self.input[self.position] if self.input else None
+    ## Scanner engines for str input. 'dfa' runs the hand-written DFAs one token at a time,
+    ## 'regex' matches tokens with one precompiled pattern and produces the same tokens and errors
+    BACKENDS = ('dfa', 'regex')
 
-    def __init__(self):
+    ## record_symbols=False leaves the symbol table empty, so scanning a large
+    ## input doesn't keep a copy of every distinct string value
+    def __init__(self, record_symbols=True, backend='dfa'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown lexer backend '{backend}', expected one of {', '.join(self.BACKENDS)}")
         self.symbol_table = {}
+        self.record_symbols = record_symbols
+        self.backend = backend
         self.input = ''
         self.current_char = ''
 
@@ -63,54 +142,44 @@ class Lexer:
             self.advance()    
 
 
+    ## Strings have no escape characters, so the DFA for a string reduces to
+    ## "everything up to the next quotation mark". The closing quote is located
+    ## with str.find and the lexeme is taken as a single slice of the input.
     def recognize_string(self):
-        states={
-            "START":0,
-            "STRING":1,
-            "END":3,
-            "REJECTED":4
-        }
-        result = ''
-        current_state = states['START']
-        final_state = states['END']
-
-        while self.current_char is not None and current_state != states['END']:
-            #This if block is the entire DFA for recognizing a string
-            if current_state == states["START"] and self.current_char == '"':
-                current_state = states['STRING']
-            elif current_state == states['STRING']:
-                if self.current_char == '"':
-                    current_state = states['END']
-            else:
-                current_state = states['REJECTED']
-                
-            if current_state == states['REJECTED']:
-                break
-            
-            if self.current_char!='"':
-                result+= self.current_char
-            self.advance()
-            
+        start = self.position + 1
+        end = self.input.find('"', start)
+
         #Check if the final state hasn't been reached
-        if current_state != final_state:
-            if len(result)==0:  
+        if end == -1:
+            result = self.input[start:]
+            self.position = len(self.input)
+            self.current_char = None
+            if len(result)==0:
                 raise EndOfInputError(self.position, self.current_char)
             else:
                 raise EndOfInputError(self.position, result)
 
-        self.symbol_table[result] = TokenType.STRING
+        result = self.input[start:end]
+        self.position = end
+        self.advance()
+
+        if self.record_symbols:
+            self.symbol_table[result] = TokenType.STRING
         return Token(TokenType.STRING, result)
     
     
     #This method uses the number DFA given in the PDF 
-    #to recognize numbers and tokenize them
+    #to recognize numbers and tokenize them.
+    #The span of number characters is found with a precompiled pattern
+    #and the lexeme is taken as a single slice of the input.
     def recognize_num(self):
-        result = ''
-        
-        while self.current_char is not None and (self.current_char.isdigit() or self.current_char in ['+','-','.','e']):
-            result+=self.current_char
-            self.advance()
-        
+        start = self.position
+        end = number_end(self.input, start)
+
+        result = self.input[start:end]
+        self.position = end - 1
+        self.advance()
+
         return Token(TokenType.NUM, result)
 
 
@@ -213,8 +282,9 @@ class Lexer:
       
         
     def get_next_token(self):
+        ## whitespace is skipped first so trailing whitespace ends in EOF
+        self.skip_white_space()
         if self.current_char is not None:
-            self.skip_white_space()
             
             if self.current_char == '{':
                 self.advance()
@@ -250,19 +320,460 @@ class Lexer:
         
         return Token(TokenType.EOF,TokenType.EOF)
         
-    def tokenize(self, input):
-        tokens = []
+    ## Points the lexer at a new input, scanning from position start
+    def reset(self, input, start=0):
         self.input = input
-        self.position = 0
-        self.current_char = self.input[self.position] if self.input else None
+        self.position = start
+        self.current_char = self.input[self.position] if start < len(self.input) else None
         self.symbol_table = {}
+
+    ## Yields the tokens of the input one at a time, ending with the EOF token.
+    ## Nothing but the current token is held, so a parser consuming this
+    ## generator works while the input is still being scanned.
+    ## The input is either a str, or UTF-8 bytes in any bytes-like object
+    ## (bytes, mmap, memoryview), which are scanned by iter_byte_tokens.
+    ## A str input can also be scanned from position start onwards, as the
+    ## incremental parser does to scan again after an edit
+    def iter_tokens(self, input, start=0):
+        if not isinstance(input, str):
+            return self.iter_byte_tokens(input)
+        if self.backend == 'regex':
+            return self.iter_regex_tokens(input, start)
+        return self.iter_text_tokens(input, start)
+
+    ## Every scanning mode sets token_start and position to the start and end of
+    ## each token's lexeme before yielding it, which tokenize_compact records
+    def iter_text_tokens(self, input, start=0):
+        self.reset(input, start)
         token = Token(None,None)
         while token.type != TokenType.EOF:
-            token = self.get_next_token()     
-            tokens.append(token)
-            
+            self.skip_white_space()
+            self.token_start = self.position
+            token = self.get_next_token()
+            yield token
+
+    ## Scans with MASTER_PATTERN, which skips whitespace and matches a whole token per call.
+    ## Anything the pattern doesn't accept (an unterminated string, a bad keyword,
+    ## a non-ASCII digit) is handed to the DFAs at that position, so the
+    ## tokens and errors are exactly those of the DFA backend.
+    def iter_regex_tokens(self, input, start=0):
+        self.reset(input, start)
+        match = MASTER_PATTERN.scanner(input, start).match
+        position = start
+
+        while True:
+            token_match = match()
+            if token_match is None:
+                self.position = position
+                self.current_char = input[position] if position < len(input) else None
+                self.skip_white_space()
+                self.token_start = self.position
+                token = self.get_next_token()
+                if token.type == TokenType.EOF:
+                    break
+                yield token
+                position = self.position
+                match = MASTER_PATTERN.scanner(input, position).match
+                continue
+
+            kind = token_match.lastgroup
+            self.token_start = token_match.start(kind)
+            self.position = position = token_match.end()
+            if kind == TokenType.STRING:
+                result = token_match['BODY']
+                if self.record_symbols:
+                    self.symbol_table[result] = TokenType.STRING
+                yield Token(TokenType.STRING, result)
+            else:
+                yield Token(kind, token_match[kind])
+
+        yield token
+
+    ## Scans raw UTF-8 bytes without decoding the whole input.
+    ## Structural characters, numbers and keywords are classified on bytes, and only
+    ## string values and lexemes that become token values are decoded.
+    ## Positions in errors are byte offsets. Only ASCII characters count as
+    ## whitespace or digits here, so a non-ASCII digit outside a string is rejected.
+    def iter_byte_tokens(self, buffer):
+        self.symbol_table = {}
+        length = len(buffer)
+        position = BYTE_WHITESPACE.match(buffer, 0).end()
+
+        while position < length:
+            byte = buffer[position]
+            single = BYTE_SINGLE_TOKENS.get(byte)
+
+            if single is not None:
+                token = Token(single, BYTE_TOKEN_VALUES[single])
+                end = position + 1
+            elif byte == QUOTE_BYTE:
+                start = position + 1
+                end = BYTE_STRING_BODY.match(buffer, start).end()
+                if end == length:
+                    result = str(buffer[start:], 'utf-8')
+                    raise EndOfInputError(length, result if len(result) != 0 else None)
+                result = str(buffer[start:end], 'utf-8')
+                if self.record_symbols:
+                    self.symbol_table[result] = TokenType.STRING
+                token = Token(TokenType.STRING, result)
+                end += 1
+            elif byte in BYTE_NUMBER_START:
+                end = BYTE_NUMBER_SPAN.match(buffer, position).end()
+                token = Token(TokenType.NUM, str(buffer[position:end], 'ascii'))
+            elif byte == NULL_BYTE:
+                ## the null DFA reads the whole run of n, u and l characters
+                end = BYTE_NULL_RUN.match(buffer, position).end()
+                result = str(buffer[position:end], 'ascii')
+                if result != 'null':
+                    raise LexerError(end, result)
+                token = Token(TokenType.NULL, result)
+            elif byte in BOOL_BYTES:
+                ## the boolean DFA stops at the first character that doesn't follow
+                ## the word, and rejects a word followed by another boolean character
+                word = BOOL_BYTES[byte]
+                matched = 0
+                while matched < len(word) and position + matched < length and buffer[position + matched] == word[matched]:
+                    matched += 1
+                end = position + matched
+                result = word[:matched].decode('ascii')
+                if matched != len(word) or (end < length and buffer[end] in BOOL_RUN_BYTES):
+                    raise LexerError(end, result)
+                token = Token(TokenType.BOOL, result)
+            else:
+                raise LexerError(position, str(buffer[position:position + 4], 'utf-8', 'replace')[0])
+
+            self.token_start = position
+            self.position = end
+            yield token
+            position = BYTE_WHITESPACE.match(buffer, end).end()
+
+        self.token_start = self.position = length
+        yield Token(TokenType.EOF,TokenType.EOF)
+
+    ## Scans a file through a read-only memory map of its bytes,
+    ## so the file is never read into memory as one decoded string
+    def iter_file_tokens(self, path):
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                yield from self.iter_byte_tokens(b'')
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield from self.iter_byte_tokens(buffer)
+
+    def tokenize(self, input):
+        return list(self.iter_tokens(input))
+
+    ## Scans the input into a TokenBuffer instead of a list of Token objects
+    def tokenize_compact(self, input):
+        buffer = TokenBuffer(input)
+        for token in self.iter_tokens(input):
+            buffer.append(token.type, self.token_start, self.position)
+        return buffer
+
+"""Compact storage for a token stream. Each token is a one byte type code plus
+the start and end of its lexeme in the source, held in arrays, and Token objects
+are only created when a token is read. The source is the str or UTF-8 bytes the
+tokens were scanned from; for bytes the offsets are byte offsets.
+Iterating over the buffer yields Tokens, so a Parser can consume it directly."""
+class TokenBuffer:
+    def __init__(self, source) -> None:
+        self.source = source
+        self.types = array('B')
+        self.starts = array('q')
+        self.ends = array('q')
+
+    def append(self, token_type, start, end):
+        self.types.append(TOKEN_CODES[token_type])
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.types)
+
+    def type_at(self, index):
+        return TOKEN_TYPES[self.types[index]]
+
+    ## the value is sliced out of the source when it's asked for
+    def value_at(self, index):
+        token_type = TOKEN_TYPES[self.types[index]]
+        if token_type in FIXED_VALUES:
+            return FIXED_VALUES[token_type]
+        start = self.starts[index]
+        end = self.ends[index]
+        ## the lexeme of a string includes its quotation marks
+        if token_type == TokenType.STRING:
+            start += 1
+            end -= 1
+        value = self.source[start:end]
+        return value if isinstance(value, str) else str(value, 'utf-8')
+
+    def __getitem__(self, index):
+        return Token(self.type_at(index), self.value_at(index))
+
+    def __iter__(self):
+        source = self.source
+        decode = not isinstance(source, str)
+        for code, start, end in zip(self.types, self.starts, self.ends):
+            token_type = TOKEN_TYPES[code]
+            value = FIXED_VALUES.get(token_type)
+            if value is None:
+                if token_type == TokenType.STRING:
+                    value = source[start + 1:end - 1]
+                else:
+                    value = source[start:end]
+                if decode:
+                    value = str(value, 'utf-8')
+            yield Token(token_type, value)
+
+    ## bytes used by the arrays, not counting the source
+    def nbytes(self):
+        return sum(len(column) * column.itemsize for column in (self.types, self.starts, self.ends))
+
+
+"""Push-mode front end for the Lexer, for input that arrives in chunks.
+feed() takes the next chunk and returns the tokens it completed. A string,
+number or keyword that runs up to the end of a chunk is held back until the
+chunk that finishes it arrives, so tokens are the same wherever the input
+is split. close() scans whatever is left and returns the rest of the tokens,
+ending with EOF. Error positions are counted from the start of the whole input."""
+class PushLexer:
+    ## Tokens that can grow if more input follows them
+    HELD_TYPES = (TokenType.NUM, TokenType.BOOL, TokenType.NULL)
+
+    def __init__(self, lexer=None) -> None:
+        self.lexer = lexer if lexer is not None else Lexer()
+        self.lexer.reset('')
+        ## unscanned text, starting at the lexeme that is being held back
+        self.buffer = ''
+        ## chunks that arrived without finishing the held lexeme
+        self.pending = []
+        self.held = 0
+        ## position of buffer[0] in the whole input
+        self.offset = 0
+        self.closed = False
+
+    def feed(self, chunk):
+        if self.closed:
+            raise ValueError('feed() called after close()')
+        if not chunk:
+            return []
+
+        ## only join the held text back together once the lexeme can be finished,
+        ## so a long string spread over many chunks is scanned once
+        if self.buffer and not self.lexeme_ends_in(chunk):
+            self.pending.append(chunk)
+            self.held += len(chunk)
+            return []
+
+        text = self.buffer + ''.join(self.pending) + chunk
+        self.pending = []
+        return self.scan(text, False)
+
+    def close(self):
+        if self.closed:
+            return []
+        text = self.buffer + ''.join(self.pending)
+        self.pending = []
+        tokens = self.scan(text, True)
+        tokens.append(Token(TokenType.EOF, TokenType.EOF))
+        self.closed = True
+        return tokens
+
+    ## checks whether the chunk contains the end of the held lexeme
+    def lexeme_ends_in(self, chunk):
+        first = self.buffer[0]
+        if first == '"':
+            return '"' in chunk
+        if first == 'n':
+            return NULL_RUN.match(chunk).end() < len(chunk)
+        if first in 'tf':
+            ## the boolean DFA decides within 6 characters
+            return self.held + len(chunk) > 5 or BOOL_RUN.match(chunk).end() < len(chunk)
+        return number_end(chunk, 0) < len(chunk)
+
+    ## scans text into tokens. Unless this is the final text, a lexeme that reaches
+    ## the end of the text is kept in the buffer instead of being returned or rejected
+    def scan(self, text, final):
+        lexer = self.lexer
+        lexer.input = text
+        lexer.position = 0
+        lexer.current_char = text[0] if text else None
+        tokens = []
+        start = 0
+        try:
+            while True:
+                lexer.skip_white_space()
+                start = lexer.position
+                if lexer.current_char is None:
+                    break
+                token = lexer.get_next_token()
+                if lexer.current_char is None and not final and token.type in self.HELD_TYPES:
+                    break
+                tokens.append(token)
+        except (LexerError, EndOfInputError) as e:
+            if final or e.position < len(text):
+                raise type(e)(self.offset + e.position, e.string) from None
+
+        self.buffer = text[start:]
+        self.held = len(self.buffer)
+        self.offset += start
         return tokens
 
+
+## Scans an iterable of text chunks, yielding tokens as each chunk completes them
+def tokenize_chunks(chunks, lexer=None):
+    push_lexer = PushLexer(lexer)
+    for chunk in chunks:
+        yield from push_lexer.feed(chunk)
+    yield from push_lexer.close()
+
+## Writes tokens to a file object in the ScannerOutput format, one token per line
+def write_tokens(tokens, file):
+    file.write(''.join(token.__repr__() + '\n' for token in tokens))
+
+## Passes tokens through unchanged while writing each one to a file object
+## in the ScannerOutput format. Used to keep a debug copy of the token stream
+## when the tokens go straight into the parser.
+def dump_tokens(tokens, file):
+    for token in tokens:
+        file.write(token.__repr__() + '\n')
+        yield token
+
+
+## Binary token files start with TOKEN_FILE_MAGIC and this header, all little-endian:
+## version, bytes per value index, token count, value count, string count, string bytes size
+TOKEN_FILE_MAGIC = b'JTOK'
+TOKEN_FILE_VERSION = 1
+TOKEN_FILE_HEADER = struct.Struct('<4sBBxxIIII')
+## The array type of the value indexes, by the number of bytes each one takes
+INDEX_TYPECODES = {1: 'B', 2: 'H', 4: 'I'}
+
+## Writes tokens to a binary file object in the token file format:
+##     header
+##     string offsets: string count + 1 unsigned 32 bit integers
+##     value indexes: the string number of each token that has a value of its own
+##     type codes: one byte per token, from TOKEN_CODES
+##     strings: the UTF-8 bytes of every distinct value, one after another
+## String i runs from offset i to offset i + 1, so the table is length-prefixed
+## without a length in front of each string. Values that repeat, such as keys,
+## are stored once, and the value indexes take 1, 2 or 4 bytes each depending on
+## how many strings there are. Tokens such as '{' are only their type code.
+## The arrays start 4 byte aligned, so a reader can use them in place.
+def write_token_file(tokens, file):
+    codes = bytearray()
+    values = []
+    strings = {}
+    for token in tokens:
+        codes.append(TOKEN_CODES[token.type])
+        if token.type not in FIXED_VALUES:
+            values.append(strings.setdefault(token.value, len(strings)))
+
+    string_bytes = bytearray()
+    offsets = array('I', [0])
+    for value in strings:
+        string_bytes += value.encode('utf-8')
+        offsets.append(len(string_bytes))
+    width = 1 if len(strings) <= 0x100 else 2 if len(strings) <= 0x10000 else 4
+    values = array(INDEX_TYPECODES[width], values)
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+        values.byteswap()
+
+    file.write(TOKEN_FILE_HEADER.pack(TOKEN_FILE_MAGIC, TOKEN_FILE_VERSION, width,
+                                      len(codes), len(values), len(strings), len(string_bytes)))
+    file.write(offsets)
+    file.write(values)
+    file.write(codes)
+    file.write(string_bytes)
+
+
+class TokenFileError(Exception):
+    def __init__(self, path, reason) -> None:
+        self.path = path
+        self.reason = reason
+        super().__init__(f"'{path}' is not a token file: {reason}")
+
+
+"""Reads a binary token file through a read-only memory map. The type codes,
+value indexes and string offsets are used in place, so opening the file only
+reads its header, and each value is decoded the first time a token uses it.
+Iterating over the file yields Tokens, so a Parser can consume it directly.
+Close the file, or use it in a with block, once its tokens have been read."""
+class TokenFile:
+    def __init__(self, path) -> None:
+        self.path = path
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < TOKEN_FILE_HEADER.size:
+                raise TokenFileError(path, 'too short')
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, width, count, value_count, string_count, string_size = TOKEN_FILE_HEADER.unpack_from(self.buffer)
+        if magic != TOKEN_FILE_MAGIC or version != TOKEN_FILE_VERSION or width not in INDEX_TYPECODES:
+            self.buffer.close()
+            raise TokenFileError(path, f'unknown magic {magic!r}, version {version} or index width {width}')
+        sizes = (4 * (string_count + 1), width * value_count, count, string_size)
+        if TOKEN_FILE_HEADER.size + sum(sizes) != size:
+            self.buffer.close()
+            raise TokenFileError(path, "the sections don't add up to the size of the file")
+
+        sections = []
+        start = TOKEN_FILE_HEADER.size
+        with memoryview(self.buffer) as view:
+            for section_size in sizes:
+                sections.append(view[start:start + section_size])
+                start += section_size
+        offsets, values, self.codes, self.string_bytes = sections
+        if sys.byteorder == 'little':
+            self.offsets = offsets.cast('I')
+            self.values = values.cast(INDEX_TYPECODES[width])
+        else:
+            ## the arrays are stored little-endian, so they are copied and swapped
+            self.offsets = array('I', offsets.tobytes())
+            self.offsets.byteswap()
+            self.values = array(INDEX_TYPECODES[width], values.tobytes())
+            self.values.byteswap()
+        offsets.release()
+        values.release()
+        self.strings = [None] * string_count
+
+    def __len__(self):
+        return len(self.codes)
+
+    ## the value of string number index, decoded once
+    def string(self, index):
+        value = self.strings[index]
+        if value is None:
+            value = self.strings[index] = str(self.string_bytes[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+        return value
+
+    def __iter__(self):
+        strings = self.strings
+        values = iter(self.values)
+        for code in self.codes:
+            token_type = TOKEN_TYPES[code]
+            value = FIXED_VALUES.get(token_type)
+            if value is None:
+                value_index = next(values)
+                value = strings[value_index]
+                if value is None:
+                    value = self.string(value_index)
+            yield Token(token_type, value)
+
+    ## Releases the views and the memory map. Tokens already read stay valid
+    def close(self):
+        for view in (self.offsets, self.values, self.codes, self.string_bytes):
+            if isinstance(view, memoryview):
+                view.release()
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 def main():
     lexer = Lexer()
     for i in range(1, 21):
@@ -273,10 +784,7 @@ def main():
                     input_string = file.read().strip()
                     tokens = lexer.tokenize(input_string)
                 with open(f'ParserInputs/ScannerOutput{i:02d}.txt', 'w') as f:
-                    output_string = ''
-                    for token in tokens:
-                        output_string += token.__repr__() +'\n'
-                    f.write(output_string)
+                    write_tokens(tokens, f)
             except Exception as e:
                 with open(f'ParserInputs/ScannerOutput{i:02d}.txt', 'w') as f:
                     output_string = traceback.format_exc()
@@ -0,0 +1,156 @@
+"""Parses newline-delimited JSON: a stream holding one document per line.
+
+One Lexer and one Parser are reused for every record, and a record that fails
+to scan or parse is reported without stopping the stream:
+    for record in parse_records(open('feed.ndjson')):
+        print(record.line_number, record.error or record.value)
+Records can also be spread over worker processes, handed out a chunk of lines
+at a time, with the results coming back in the order of the lines or as soon
+as each chunk is done:
+    python JsonStream.py feed.ndjson --workers 4 --unordered > values.ndjson"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+
+from JsonScanner import Lexer
+from JsonParser import Parser, RULE_PROFILES
+
+
+"""The outcome of one record of the stream. Records are sent back from
+the worker processes, so the error is kept as its repr, the way the
+ParserOutputs files show it, rather than as the exception."""
+class StreamRecord:
+    __slots__ = ('line_number', 'value', 'error')
+
+    ## line_number counts from 1. error is None when the record parsed
+    def __init__(self, line_number, value, error=None):
+        self.line_number = line_number
+        self.value = value
+        self.error = error
+
+    def __repr__(self) -> str:
+        if self.error is not None:
+            return f"StreamRecord({self.line_number}, error={self.error})"
+        return f"StreamRecord({self.line_number}, {self.value!r})"
+
+
+"""Scans and parses one record after another with a single Lexer and Parser.
+The Lexer is pointed at each record by iter_tokens and the Parser by reset,
+so nothing is built again per record. Options go to the Parser."""
+class RecordParser:
+    def __init__(self, **options):
+        self.lexer = Lexer(record_symbols=False)
+        self.parser = Parser((), **options)
+
+    ## Parses the text or UTF-8 bytes of one record, raising its error if it has one
+    def parse(self, text):
+        self.parser.reset(self.lexer.iter_tokens(text))
+        return self.parser.parse()
+
+    ## Parses one record, keeping its error instead of raising it
+    def parse_record(self, line_number, text):
+        try:
+            return StreamRecord(line_number, self.parse(text))
+        except Exception as e:
+            return StreamRecord(line_number, None, repr(e))
+
+
+## Yields the line number and text of every line of the stream that holds a record.
+## The stream is a file object, opened as text or as bytes, or any iterable of lines.
+## Blank lines are skipped but still counted
+def iter_lines(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line:
+            yield line_number, line
+
+## Parses every record of the stream in this process, yielding a StreamRecord for each
+def parse_records(stream, **options):
+    record_parser = RecordParser(**options)
+    for line_number, text in iter_lines(stream):
+        yield record_parser.parse_record(line_number, text)
+
+## Parses one chunk of numbered lines in a worker process
+def parse_chunk(chunk, options):
+    record_parser = RecordParser(**options)
+    return [record_parser.parse_record(line_number, text) for line_number, text in chunk]
+
+## Splits the numbered lines into lists of up to chunksize lines
+def iter_chunks(lines, chunksize):
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+## Takes finished chunks off the pending futures: the oldest one when ordered,
+## otherwise every chunk that is done, waiting for at least one
+def take_done(pending, ordered):
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    records = []
+    for future in done:
+        pending.remove(future)
+        records.extend(future.result())
+    return records
+
+## Parses every record of the stream on a pool of worker processes, yielding a StreamRecord for each.
+## Lines are sent to the workers chunksize at a time, and at most two chunks per worker
+## are in flight, so the stream is read as the records are consumed rather than all at once.
+## With ordered=True the records come back in the order of the lines,
+## otherwise each chunk's records come back as soon as it is parsed.
+## workers=1 parses in this process, like parse_records
+def stream_records(stream, workers=None, ordered=True, chunksize=256, **options):
+    if workers == 1:
+        yield from parse_records(stream, **options)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in iter_chunks(iter_lines(stream), chunksize):
+            pending.append(executor.submit(parse_chunk, chunk, options))
+            if len(pending) >= 2 * workers:
+                yield from take_done(pending, ordered)
+        while pending:
+            yield from take_done(pending, ordered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', default='-', help='newline-delimited JSON file, - for stdin')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes, 0 for one per CPU')
+    parser.add_argument('--chunksize', type=int, default=256, help='lines handed to a worker at a time')
+    parser.add_argument('--unordered', action='store_true', help='write records as soon as they are parsed')
+    parser.add_argument('--engine', choices=Parser.ENGINES, default='recursive')
+    parser.add_argument('--rules', choices=list(RULE_PROFILES), default='strict', help='semantic rule profile')
+    args = parser.parse_args()
+
+    ## values are built as native objects so they can be written back as JSON lines
+    stream = sys.stdin if args.input == '-' else open(args.input, 'r')
+    records = stream_records(stream, args.workers or None, not args.unordered, args.chunksize,
+                             native=True, engine=args.engine, rules=args.rules)
+
+    start = time.perf_counter()
+    count = errors = 0
+    with stream:
+        for record in records:
+            count += 1
+            if record.error is not None:
+                errors += 1
+                print(f"line {record.line_number}: {record.error}", file=sys.stderr)
+            else:
+                sys.stdout.write(json.dumps(record.value) + '\n')
+    seconds = time.perf_counter() - start
+    print(f"{count} records, {errors} errors in {seconds:.3f}s ({count / seconds:,.0f} records/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()